@@ -0,0 +1,206 @@
+"""
+Standalone benchmark runner for the integrators, grid engines and renderers.
+
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --compare results.json --threshold 1.2
+
+Results are written as JSON (one entry per benchmark with its timing statistics and
+the environment), so two commits can be compared with --compare, which exits with
+status 1 when a benchmark got slower than `threshold` times its baseline median.
+"""
+import argparse
+import contextlib
+import inspect
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Modules of the package import each other by their flat names
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "double_pendulum"))
+
+from pendulum import SimplePendulum, DoublePendulum
+from pendulum_matrix import compute_colormap, matrix_generator, DoublePendulumMatrix
+from optimized_pendulum_matrix import optimized_different_angles
+from bifurcation_diagram import bifurcation_diagram_optimized
+from colormap_lut import ColormapCache, AngleColorizer
+from frame_writer import FrameWriter
+
+DT = 1e-3
+BENCHMARKS = []
+
+
+def benchmark(name, **params):
+    """
+    Registers setup(**params), which prepares the inputs and returns the callable to time.
+    A setup that holds resources can instead yield the callable: it is resumed after timing.
+    """
+    def register(setup):
+        BENCHMARKS.append((name, params, setup))
+        return setup
+    return register
+
+
+@benchmark("simple_pendulum.step", steps=1000)
+def _simple_pendulum_step(steps):
+    pendulum = SimplePendulum()
+    return lambda: [pendulum.step(DT) for _ in range(steps)]
+
+
+@benchmark("double_pendulum.step", steps=1000)
+def _double_pendulum_step(steps):
+    pendulum = DoublePendulum()
+    return lambda: [pendulum.step(DT) for _ in range(steps)]
+
+
+@benchmark("double_pendulum.step_n", steps=1000)
+def _double_pendulum_step_n(steps):
+    pendulum = DoublePendulum()
+    pendulum.step_n(DT, 1)  # Compiles the fused kernel when Numba is available
+    return lambda: pendulum.step_n(DT, steps)
+
+
+@benchmark("double_pendulum_matrix.step", N=50, steps=10)
+def _double_pendulum_matrix_step(N, steps):
+    matrix = DoublePendulumMatrix(matrix_generator(N, N))
+    return lambda: [matrix.step(DT) for _ in range(steps)]
+
+
+for _size in (64, 256, 512):
+    for _kernel in ("inplace", "legacy"):
+        @benchmark("optimized_pendulum_matrix.step", N=_size, kernel=_kernel, dtype="float64", steps=10)
+        @benchmark("optimized_pendulum_matrix.step", N=_size, kernel=_kernel, dtype="float32", steps=10)
+        def _optimized_matrix_step(N, kernel, dtype, steps):
+            pendulums = optimized_different_angles(N, N, kernel=kernel, dtype=dtype)
+            return lambda: [pendulums.step(DT) for _ in range(steps)]
+
+
+@benchmark("bifurcation_diagram_optimized", n_omega2=100, T=2.0)
+def _bifurcation_diagram(n_omega2, T):
+    return lambda: bifurcation_diagram_optimized(n_omega2=n_omega2, T=T, dt=DT, plot=False)
+
+
+@benchmark("compute_colormap", N=256)
+def _compute_colormap(N):
+    return lambda: compute_colormap(N, N)
+
+
+@benchmark("colormap_lut.cold", N=256)
+def _colormap_lut_cold(N):
+    return lambda: ColormapCache().get(N, N)
+
+
+@benchmark("angle_colorizer", N=256)
+def _angle_colorizer(N):
+    pendulums = optimized_different_angles(N, N)
+    colorizer = AngleColorizer(N, N)
+    return lambda: colorizer(pendulums.theta1, pendulums.theta2)
+
+
+@benchmark("frame_writer.gif", N=128, frames=20)
+def _gif_encoding(N, frames):
+    pendulums = optimized_different_angles(N, N)
+    image = AngleColorizer(N, N)(pendulums.theta1, pendulums.theta2)
+
+    with tempfile.TemporaryDirectory() as directory:
+        def encode():
+            with FrameWriter(os.path.join(directory, "benchmark.gif"), fps=10) as writer:
+                for _ in range(frames):
+                    writer.append(image)
+        yield encode
+
+
+def benchmark_key(name, params):
+    return name + "[" + ",".join(f"{key}={value}" for key, value in sorted(params.items())) + "]"
+
+
+def time_benchmark(function, repeat, min_time):
+    """Runs function once to warm up, then at least `repeat` times and `min_time` seconds."""
+    function()
+    times = []
+    start = time.perf_counter()
+    while len(times) < repeat or time.perf_counter() - start < min_time:
+        t0 = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - t0)
+    return {"rounds": len(times), "min": min(times), "median": statistics.median(times),
+            "mean": statistics.mean(times), "stdev": statistics.stdev(times) if len(times) > 1 else 0.0}
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"commit": commit, "python": platform.python_version(), "numpy": np.__version__,
+            "machine": platform.machine(), "processor": platform.processor(), "cpu_count": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def run(filter_text=None, repeat=5, min_time=0.2):
+    results = []
+    for name, params, setup in BENCHMARKS:
+        key = benchmark_key(name, params)
+        if filter_text and filter_text not in key:
+            continue
+        function = setup(**params)
+        if inspect.isgenerator(function):
+            with contextlib.closing(function):  # Runs the code after the yield
+                stats = time_benchmark(next(function), repeat, min_time)
+        else:
+            stats = time_benchmark(function, repeat, min_time)
+        results.append({"name": name, "key": key, "params": params, **stats})
+        print(f"{key:75s} median {stats['median'] * 1e3:10.3f} ms  ({stats['rounds']} rounds)", file=sys.stderr)
+    return {"environment": environment(), "results": results}
+
+
+def compare(results, baseline, threshold):
+    """Prints the median ratio current / baseline of every common benchmark, returns the regressions."""
+    previous = {entry["key"]: entry for entry in baseline["results"]}
+    regressions = []
+    for entry in results["results"]:
+        if entry["key"] not in previous:
+            continue
+        ratio = entry["median"] / previous[entry["key"]]["median"]
+        flag = "REGRESSION" if ratio > threshold else ""
+        print(f"{entry['key']:75s} x{ratio:6.2f} {flag}")
+        if ratio > threshold:
+            regressions.append(entry["key"])
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", help="JSON file receiving the results (printed to stdout otherwise)")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2, help="median ratio reported as a regression")
+    parser.add_argument("--filter", help="only run the benchmarks whose key contains this text")
+    parser.add_argument("--repeat", type=int, default=5, help="minimum number of timed rounds")
+    parser.add_argument("--min-time", type=float, default=0.2, help="minimum timed seconds per benchmark")
+    args = parser.parse_args(argv)
+
+    results = run(args.filter, args.repeat, args.min_time)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
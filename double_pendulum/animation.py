@@ -1,40 +1,45 @@
-from pendulum_matrix import compute_colormap, matrix_generator, DoublePendulumMatrix 
+from pendulum_matrix import matrix_generator, DoublePendulumMatrix 
 from optimized_pendulum_matrix import OptimizedPendulumMatrix, rk4_step, optimized_different_angles, optimized_different_speeds
+from frame_writer import FrameWriter
+from colormap_lut import AngleColorizer
+from checkpoint import save_checkpoint, restore_checkpoint
+from instrumentation import instrumentation
+import os
 import numpy as np
-import imageio.v2 as imageio
 import matplotlib.pyplot as plt
 
-def matrix_simulation_gif(N, dt=1e-3, tau=0.1, T=10.0, filename="pendulum_matrix_simulation.gif"):
+def matrix_simulation_gif(N, dt=1e-3, tau=0.1, T=10.0, filename="pendulum_matrix_simulation.gif", dtype=np.float64):
     """
     Simule l'évolution de la matrice de pendules et génère un fichier GIF 
     représentant l'évolution des couleurs.
+    Les images sont écrites au fil de l'eau (voir FrameWriter : .gif, .mp4 ou dossier de PNG).
+    dtype=np.float32 divise par deux la mémoire des états (voir precision.py).
     """
     M = N 
     num_steps = int(T / dt)
     steps_per_frame = int(tau / dt)
-    matrix = matrix_generator(N, M)
+    matrix = matrix_generator(N, M, dtype=dtype)
     pendulum_matrix = DoublePendulumMatrix(matrix)
 
-    frames = []
+    with FrameWriter(filename, fps=int(1 / tau)) as writer:
+        for step in range(num_steps):
+            with instrumentation.stage("integration"):
+                pendulum_matrix.step(dt) 
+            instrumentation.count("steps")
+            instrumentation.count("cell_steps", N * M)
 
-    for step in range(num_steps):
-        pendulum_matrix.step(dt) 
-
-        if step % steps_per_frame == 0:
-            pendulum_matrix.update_color()
-            image = pendulum_matrix.get_image()
-
-            frames.append(image)
+            if step % steps_per_frame == 0:
+                with instrumentation.stage("colouring"):
+                    pendulum_matrix.update_color()
+                    image = pendulum_matrix.get_image()
 
-    # Convert to uint8 format for GIF 
-    frames_uint8 = [np.clip(frame * 255, 0, 255).astype(np.uint8) for frame in frames] 
+                # Converted to uint8 and written right away
+                writer.append(image)
+                instrumentation.tick()
 
-    # Save as GIF
-    imageio.mimsave(filename, frames_uint8, fps=int(1 / tau)) 
-
-def matrix_simulation_live(N, dt=1e-3, tau=0.1, T=10.0):
+def matrix_simulation_live(N, dt=1e-3, tau=0.1, T=10.0, dtype=np.float64):
     M = N
-    matrix = matrix_generator(N, M)
+    matrix = matrix_generator(N, M, dtype=dtype)
     pendulum_matrix = DoublePendulumMatrix(matrix)
 
     num_steps = int(T / dt)
@@ -51,59 +56,87 @@ def matrix_simulation_live(N, dt=1e-3, tau=0.1, T=10.0):
     plt.show()
 
     for step in range(num_steps):
-        pendulum_matrix.step(dt)
+        with instrumentation.stage("integration"):
+            pendulum_matrix.step(dt)
+        instrumentation.count("steps")
+        instrumentation.count("cell_steps", N * M)
 
         if step % steps_per_frame == 0:
-            pendulum_matrix.update_color()
-            image = pendulum_matrix.get_image()
+            with instrumentation.stage("colouring"):
+                pendulum_matrix.update_color()
+                image = pendulum_matrix.get_image()
 
             # Update image data
-            im.set_data(image)
-            ax.set_title(f"Step {step}/{num_steps}")
-            fig.canvas.draw()
-            # Small pause so the GUI can update
-            plt.pause(0.001)
+            with instrumentation.stage("display"):
+                im.set_data(image)
+                ax.set_title(f"Step {step}/{num_steps}")
+                fig.canvas.draw()
+                # Small pause so the GUI can update
+                plt.pause(0.001)
+            instrumentation.tick()
 
     # Keep the window open at the end
     plt.ioff()
     plt.show()
 
-def optimized_simulation_gif(pendulums, dt=1e-3, tau=0.1, T=10.0, filename="optimized_pendulum_matrix_simulation.gif"):
+def optimized_simulation_gif(pendulums, dt=1e-3, tau=0.1, T=10.0, filename="optimized_pendulum_matrix_simulation.gif",
+                             checkpoint_path=None, checkpoint_every=100, dtype=None):
     """
     Simule l'évolution de la matrice de pendules optimisée et génère un fichier GIF 
     représentant l'évolution des couleurs.
+    Les images sont écrites au fil de l'eau (voir FrameWriter : .gif, .mp4 ou dossier de PNG).
+    Avec checkpoint_path, l'état est sauvegardé toutes les checkpoint_every images et une
+    sauvegarde existante est reprise (avec les mêmes dt, tau et T) ; seule une séquence PNG
+    peut être reprise, filename doit donc être un dossier (sans extension).
+    Avec dtype (par ex. np.float32), la simulation porte sur une copie de pendulums dans
+    cette précision.
     """
+    if dtype is not None:
+        pendulums = pendulums.astype(dtype)
     N = pendulums.N
     M = pendulums.M
-    colormap = compute_colormap(N, M)
+    colorizer = AngleColorizer(N, M)
     num_steps = int(T / dt)
     steps_per_frame = int(tau / dt)
-    frames = [] 
-
-    for step in range(num_steps):
-        pendulums.step(dt) 
-
-        if step % steps_per_frame == 0:
-            # Compute colors based on angles
-            theta1 = pendulums.theta1
-            theta2 = pendulums.theta2
-            i_indices = ((theta1 + np.pi) / (2 * np.pi) * N).astype(int) % N
-            j_indices = ((theta2 + np.pi) / (2 * np.pi) * M).astype(int) % M
-
-            image = colormap[i_indices, j_indices]
-
-            frames.append(image)
-
-    # Convert to uint8 format for GIF 
-    frames_uint8 = [np.clip(frame * 255, 0, 255).astype(np.uint8) for frame in frames] 
-
-    # Save as GIF
-    imageio.mimsave(filename, frames_uint8, fps=int(1 / tau))
 
-def optimized_simulation_live(pendulums, dt=1e-3, tau=0.1, T=10.0):
+    if checkpoint_path is not None and os.path.splitext(filename)[1] != "":
+        raise ValueError("Checkpoints require a PNG sequence output (filename without extension), "
+                         "the only one that can be resumed.")
+
+    settings = np.array([dt, tau, T])
+    start_step, start_frame = 0, 0
+    if checkpoint_path is not None and os.path.exists(checkpoint_path):
+        start_step, extra = restore_checkpoint(checkpoint_path, pendulums)
+        if not np.array_equal(extra["settings"], settings):
+            raise ValueError(f"Checkpoint {checkpoint_path} was saved with different settings.")
+        start_frame = extra["frame_count"]
+
+    with FrameWriter(filename, fps=int(1 / tau), start_frame=start_frame) as writer:
+        for step in range(start_step, num_steps):
+            with instrumentation.stage("integration"):
+                pendulums.step(dt) 
+            instrumentation.count("steps")
+            instrumentation.count("cell_steps", N * M)
+
+            if step % steps_per_frame == 0:
+                # Compute uint8 colors based on angles (cached lookup table)
+                with instrumentation.stage("colouring"):
+                    image = colorizer(pendulums.theta1, pendulums.theta2)
+
+                # Written right away
+                writer.append(image)
+                instrumentation.tick()
+
+                if checkpoint_path is not None and writer.frame_count % checkpoint_every == 0:
+                    save_checkpoint(checkpoint_path, pendulums, step + 1, time=(step + 1) * dt,
+                                    settings=settings, frame_count=writer.frame_count)
+
+def optimized_simulation_live(pendulums, dt=1e-3, tau=0.1, T=10.0, dtype=None):
+    if dtype is not None:
+        pendulums = pendulums.astype(dtype)
     N = pendulums.N
     M = pendulums.M
-    colormap = compute_colormap(N, M)
+    colorizer = AngleColorizer(N, M)
     num_steps = int(T / dt)
     steps_per_frame = int(tau / dt)  # how often to refresh the display
 
@@ -111,33 +144,31 @@ def optimized_simulation_live(pendulums, dt=1e-3, tau=0.1, T=10.0):
     plt.ion()  # interactive mode ON
     fig, ax = plt.subplots()
     # Initial color computation
-    theta1 = pendulums.theta1
-    theta2 = pendulums.theta2
-    i_indices = ((theta1 + np.pi) / (2 * np.pi) * N).astype(int) % N
-    j_indices = ((theta2 + np.pi) / (2 * np.pi) * M).astype(int) % M
-    image = colormap[i_indices, j_indices]          # (N, N, 4) float in [0,1]
+    image = colorizer(pendulums.theta1, pendulums.theta2)   # (N, M, 4) uint8
     im = ax.imshow(image)
     ax.set_axis_off()
     plt.tight_layout()
     plt.show()
 
     for step in range(num_steps):
-        pendulums.step(dt)
+        with instrumentation.stage("integration"):
+            pendulums.step(dt)
+        instrumentation.count("steps")
+        instrumentation.count("cell_steps", N * M)
 
         if step % steps_per_frame == 0:
             # Compute colors based on angles
-            theta1 = pendulums.theta1
-            theta2 = pendulums.theta2
-            i_indices = ((theta1 + np.pi) / (2 * np.pi) * N).astype(int) % N 
-            j_indices = ((theta2 + np.pi) / (2 * np.pi) * M).astype(int) % M 
-            image = colormap[i_indices, j_indices]
+            with instrumentation.stage("colouring"):
+                image = colorizer(pendulums.theta1, pendulums.theta2)
 
             # Update image data
-            im.set_data(image)
-            ax.set_title(f"Step {step}/{num_steps}")
-            fig.canvas.draw()
-            # Small pause so the GUI can update
-            plt.pause(0.001)
+            with instrumentation.stage("display"):
+                im.set_data(image)
+                ax.set_title(f"Step {step}/{num_steps}")
+                fig.canvas.draw()
+                # Small pause so the GUI can update
+                plt.pause(0.001)
+            instrumentation.tick()
 
     # Keep the window open at the end
     plt.ioff()
@@ -1,14 +1,25 @@
+import os
 import numpy as np
 import matplotlib.pyplot as plt
 
 from optimized_pendulum_matrix import OptimizedPendulumMatrix
+from checkpoint import save_checkpoint, restore_checkpoint
 from constants import PHYSICS_DT
 
 
 def bifurcation_diagram_optimized(omega2_min=0.0,omega2_max=25.0,n_omega2=600,T=25.0,dt=PHYSICS_DT,samples_per_branch=150,
-        transient_ratio=0.85,theta_wrap=True,filename="illustrations/bifurcation_diagram_optimized.png"):
+        transient_ratio=0.85,theta_wrap=True,filename="illustrations/bifurcation_diagram_optimized.png",
+        checkpoint_path=None,checkpoint_every=10000,plot=True):
     """
     Vectorized bifurcation diagram using OptimizedPendulumMatrix.
+
+    Returns omega2_init (n_omega2, 1) and theta2_points, an (n_omega2, samples_per_branch)
+    array whose row i holds the θ₂ samples of branch i. plot=False skips the
+    matplotlib render and only returns the arrays.
+
+    With checkpoint_path, the integrator state and the collected samples are saved every
+    checkpoint_every steps, and an existing checkpoint is resumed (bit-for-bit) instead
+    of starting over.
     """
 
     n_steps = int(T / dt)
@@ -16,7 +27,7 @@ def bifurcation_diagram_optimized(omega2_min=0.0,omega2_max=25.0,n_omega2=600,T=
     transient_steps = int(n_steps * transient_ratio)
 
     # Sampling interval
-    sample_step = ((n_steps - transient_steps) // samples_per_branch)
+    sample_step = max(1, (n_steps - transient_steps) // samples_per_branch)
 
     omega2_init = np.linspace(omega2_min, omega2_max, n_omega2).reshape(-1,1)
 
@@ -27,25 +38,41 @@ def bifurcation_diagram_optimized(omega2_min=0.0,omega2_max=25.0,n_omega2=600,T=
 
     pend = OptimizedPendulumMatrix(N=n_omega2,M=1,theta1=theta1,theta2=theta2,omega1=omega1,omega2=omega2)
     
-    # Storage for collected θ₂
-    theta2_points = [[] for _ in range(n_omega2)]
+    # Storage for collected θ₂, one column per sample (NaN until sampled)
+    theta2_points = np.full((n_omega2, samples_per_branch), np.nan)
+
+    settings = np.array([omega2_min, omega2_max, n_omega2, T, dt, samples_per_branch, transient_ratio, theta_wrap])
+    start_step = 0
+    if checkpoint_path is not None and os.path.exists(checkpoint_path):
+        start_step, extra = restore_checkpoint(checkpoint_path, pend)
+        if not np.array_equal(extra["settings"], settings):
+            raise ValueError(f"Checkpoint {checkpoint_path} was saved with different settings.")
+        theta2_points = extra["theta2_points"]
 
     # Iterate simulation
-    for step in range(n_steps):
+    for step in range(start_step, n_steps):
         pend.step(dt)
 
-        if step >= transient_steps and (step - transient_steps) % sample_step == 0:
-            # Extract θ₂ vector (shape Nx1)
-            theta2_vec = np.rad2deg(pend.theta2[:, 0])
+        sample, offset = divmod(step - transient_steps, sample_step)
+        if step >= transient_steps and offset == 0 and sample < samples_per_branch:
+            # Write the whole θ₂ column (shape Nx1) at once
+            column = theta2_points[:, sample]
+            np.rad2deg(pend.theta2[:, 0], out=column)
 
             if theta_wrap:
-                theta2_vec = ((theta2_vec + 180) % 360) - 180
+                column += 180
+                np.mod(column, 360, out=column)
+                column -= 180
+
+        if checkpoint_path is not None and (step + 1) % checkpoint_every == 0:
+            save_checkpoint(checkpoint_path, pend, step + 1, time=(step + 1) * dt,
+                            settings=settings, theta2_points=theta2_points)
 
-            for i in range(n_omega2):
-                theta2_points[i].append(theta2_vec[i])
+    if not plot:
+        return omega2_init, theta2_points
 
     # Flatten for plotting
-    all_theta = np.hstack(theta2_points)
+    all_theta = theta2_points.ravel()
     all_omega = np.repeat(omega2_init[:, 0], samples_per_branch)
 
     # Plot (all points in blue)
@@ -63,6 +90,91 @@ def bifurcation_diagram_optimized(omega2_min=0.0,omega2_max=25.0,n_omega2=600,T=
     return omega2_init, theta2_points
 
 
+def poincare_crossings(theta1_prev, theta1_new, omega1_new):
+    """
+    Detects, per cell, a crossing of the section θ₁ = 0 (mod 2π) with ω₁ > 0 during one step.
+    Returns the crossing mask and the linear interpolation weight α in [0, 1] of each crossing.
+    """
+    turns_prev = np.floor(theta1_prev / (2 * np.pi))
+    turns_new = np.floor(theta1_new / (2 * np.pi))
+    crossed = (turns_new > turns_prev) & (omega1_new > 0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        alpha = (2 * np.pi * turns_new - theta1_prev) / (theta1_new - theta1_prev)
+    return crossed, alpha
+
+
+def bifurcation_diagram_poincare(omega2_min=0.0,omega2_max=25.0,n_omega2=600,T=25.0,dt=PHYSICS_DT,max_points_per_branch=50,
+        transient_ratio=0.5,theta_wrap=True,filename="illustrations/bifurcation_diagram_poincare.png",plot=True):
+    """
+    Bifurcation diagram from a Poincaré section: θ₂ is recorded only when θ₁ crosses 0
+    (mod 2π) with ω₁ > 0, at the crossing time interpolated within the step.
+
+    Returns omega2_init (n_omega2, 1), theta2_points (n_omega2, max_points_per_branch),
+    NaN-padded after the last crossing of each branch, and the number of crossings per branch.
+    """
+
+    n_steps = int(T / dt)
+
+    transient_steps = int(n_steps * transient_ratio)
+
+    omega2_init = np.linspace(omega2_min, omega2_max, n_omega2).reshape(-1,1)
+
+    theta1 = np.zeros((n_omega2, 1))
+    theta2 = np.zeros((n_omega2, 1))
+    omega1 = np.zeros((n_omega2, 1))
+    omega2 = omega2_init.copy()
+
+    pend = OptimizedPendulumMatrix(N=n_omega2,M=1,theta1=theta1,theta2=theta2,omega1=omega1,omega2=omega2)
+
+    theta2_points = np.full((n_omega2, max_points_per_branch), np.nan)
+    counts = np.zeros(n_omega2, dtype=int)
+    theta1_prev = np.empty(n_omega2)
+    theta2_prev = np.empty(n_omega2)
+
+    for step in range(n_steps):
+        np.copyto(theta1_prev, pend.theta1[:, 0])
+        np.copyto(theta2_prev, pend.theta2[:, 0])
+        pend.step(dt)
+
+        if step < transient_steps:
+            continue
+
+        crossed, alpha = poincare_crossings(theta1_prev, pend.theta1[:, 0], pend.omega1[:, 0])
+        rows = np.nonzero(crossed & (counts < max_points_per_branch))[0]
+        if rows.size == 0:
+            continue
+
+        # θ₂ at the interpolated crossing time
+        theta2_cross = theta2_prev[rows] + alpha[rows] * (pend.theta2[rows, 0] - theta2_prev[rows])
+        theta2_cross = np.rad2deg(theta2_cross)
+        if theta_wrap:
+            theta2_cross = ((theta2_cross + 180) % 360) - 180
+
+        theta2_points[rows, counts[rows]] = theta2_cross
+        counts[rows] += 1
+
+    if not plot:
+        return omega2_init, theta2_points, counts
+
+    all_omega = np.repeat(omega2_init[:, 0], max_points_per_branch)
+    all_theta = theta2_points.ravel()
+    recorded = ~np.isnan(all_theta)
+
+    plt.figure(figsize=(10, 6))
+    plt.scatter(all_omega[recorded], all_theta[recorded], s=1, color="blue", alpha=0.4)
+
+    plt.xlabel("Initial ω₂ (rad/s)")
+    plt.ylabel("θ₂ at section θ₁ = 0, ω₁ > 0 (degrees)")
+    plt.title("Poincaré Section Bifurcation Diagram")
+
+    plt.tight_layout()
+    plt.savefig(filename, dpi=300)
+    plt.close()
+
+    return omega2_init, theta2_points, counts
+
+
 if __name__ == "__main__":
     bifurcation_diagram_optimized()
     print("Optimized bifurcation diagram saved.")
@@ -0,0 +1,141 @@
+import time
+import numpy as np
+
+
+def minmax_decimate(x, y, n_columns):
+    """
+    Reduces a curve sorted by x to its min and max y over n_columns equal-width x bins
+    (e.g. one per pixel column), which draws the same envelope as the full curve.
+    Curves of at most 2 * n_columns points are returned unchanged.
+    """
+    n_columns = max(int(n_columns), 1)
+    if len(x) <= 2 * n_columns:
+        return x, y
+    edges = np.linspace(x[0], x[-1], n_columns + 1)
+    starts = np.unique(np.searchsorted(x, edges[:-1]))
+    starts = starts[starts < len(x)]
+    x_out = np.repeat(x[starts], 2)
+    y_out = np.empty_like(x_out)
+    y_out[0::2] = np.minimum.reduceat(y, starts)
+    y_out[1::2] = np.maximum.reduceat(y, starts)
+    return x_out, y_out
+
+
+class AxesLimits:
+    """
+    Axis limits that follow the data without rescaling every frame.
+
+    update(x, y) only changes the limits when the data (together with the frozen
+    extent of finished lines) leaves them, or fills less than min_fill of them, and
+    then leaves a margin on each side. x=False or y=False keeps that axis fixed.
+    """
+
+    def __init__(self, ax, x=True, y=True, margin=0.1, min_fill=0.5):
+        self.ax = ax
+        self.axes = (x, y)
+        self.margin = margin
+        self.min_fill = min_fill
+        self.frozen = None
+
+    def _extent(self, x, y):
+        with np.errstate(invalid="ignore"):
+            if len(x) == 0 or np.all(np.isnan(x)):
+                return None
+            return [np.nanmin(x), np.nanmax(x), np.nanmin(y), np.nanmax(y)]
+
+    def freeze(self, x, y):
+        """Adds the extent of a finished line, kept inside the limits from now on."""
+        extent = self._extent(x, y)
+        if extent is not None:
+            self.frozen = extent if self.frozen is None else self._union(self.frozen, extent)
+
+    def clear(self):
+        self.frozen = None
+
+    @staticmethod
+    def _union(a, b):
+        return [min(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), max(a[3], b[3])]
+
+    def update(self, x, y):
+        """Adjusts the limits to the data if needed, returns whether they changed."""
+        extent = self._extent(x, y)
+        if extent is None:
+            return False
+        if self.frozen is not None:
+            extent = self._union(self.frozen, extent)
+
+        changed = False
+        for axis, (enabled, get_lim, set_lim) in enumerate(((self.axes[0], self.ax.get_xlim, self.ax.set_xlim),
+                                                            (self.axes[1], self.ax.get_ylim, self.ax.set_ylim))):
+            if not enabled:
+                continue
+            low, high = get_lim()
+            data_low, data_high = extent[2 * axis], extent[2 * axis + 1]
+            span = data_high - data_low
+            too_small = 0 < span < self.min_fill * (high - low)
+            if data_low < low or data_high > high or too_small:
+                pad = self.margin * span if span > 0 else max(abs(data_high), 1.0) * self.margin
+                set_lim(data_low - pad, data_high + pad)
+                changed = True
+        return changed
+
+
+class BlitManager:
+    """
+    Redraws the animated artists of a matplotlib canvas over cached axes backgrounds.
+
+    The artists given to set_artists() are excluded from normal draws; every full draw
+    (first frame, resize, request_full_draw()) captures the background of their axes,
+    and update() then only restores those backgrounds, draws the artists and blits their
+    axes. Full draws requested by update(full=True) are throttled to one per
+    min_full_draw_interval seconds; until then the frame is blitted on the old background.
+    """
+
+    def __init__(self, canvas, min_full_draw_interval=0.25):
+        self.canvas = canvas
+        self.min_full_draw_interval = min_full_draw_interval
+        self.artists = []
+        self._backgrounds = None
+        self._full_draw_requested = True
+        self._last_full_draw = -np.inf
+        self._draw_pending = None  # Time of the draw_idle() request not drawn yet
+        canvas.mpl_connect("draw_event", self._on_draw)
+
+    def set_artists(self, artists):
+        for artist in self.artists:
+            artist.set_animated(False)  # Becomes part of the background
+        self.artists = list(artists)
+        for artist in self.artists:
+            artist.set_animated(True)
+        self.request_full_draw()
+
+    def request_full_draw(self):
+        self._full_draw_requested = True
+
+    def _on_draw(self, event):
+        self._draw_pending = None
+        self._last_full_draw = time.perf_counter()
+        axes = {artist.axes for artist in self.artists}
+        self._backgrounds = [(ax, self.canvas.copy_from_bbox(ax.bbox)) for ax in axes]
+        for artist in self.artists:
+            artist.axes.draw_artist(artist)
+
+    def update(self, full=False):
+        if full:
+            self._full_draw_requested = True
+        now = time.perf_counter()
+        if self._draw_pending is not None and now - self._draw_pending < 1.0:
+            return  # The coming draw_event draws the artists
+        throttled = now - self._last_full_draw < self.min_full_draw_interval
+        if self._backgrounds is None or (self._full_draw_requested and not throttled):
+            self._full_draw_requested = False
+            self._draw_pending = now
+            self.canvas.draw_idle()
+            return
+
+        for ax, background in self._backgrounds:
+            self.canvas.restore_region(background)
+        for artist in self.artists:
+            artist.axes.draw_artist(artist)
+        for ax, _ in self._backgrounds:
+            self.canvas.blit(ax.bbox)
@@ -0,0 +1,69 @@
+import os
+import numpy as np
+
+from optimized_pendulum_matrix import OptimizedPendulumMatrix
+
+PARAMETERS = ("m1", "m2", "l1", "l2", "g", "gamma", "rtol", "atol")
+
+
+def save_checkpoint(path, pendulums, step, **extra):
+    """
+    Writes the integrator state of an OptimizedPendulumMatrix, the step counter and any
+    extra arrays (time, collected samples, run settings...) to a compressed .npz file.
+    The file is written next to its destination and renamed, so a crash while saving
+    never leaves a truncated checkpoint behind.
+    """
+    data = {"state": pendulums.state, "step": step, "kernel": pendulums.kernel}
+    for name in PARAMETERS:
+        data[name] = getattr(pendulums, name)
+    if pendulums.h is not None:
+        data["h"] = pendulums.h
+    for name, value in extra.items():
+        data["extra_" + name] = value
+
+    tmp_path = path + ".tmp.npz"
+    np.savez_compressed(tmp_path, **data)
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path):
+    """
+    Rebuilds the OptimizedPendulumMatrix saved by save_checkpoint.
+    Returns (pendulums, step, extra) where extra maps the extra names to their arrays.
+    """
+    with np.load(path) as data:
+        state = data["state"]
+        params = {name: _to_python(data[name]) for name in PARAMETERS}
+        _, N, M = state.shape
+        pendulums = OptimizedPendulumMatrix(N, M, state[0], state[2], state[1], state[3],
+                                            kernel=str(data["kernel"]), dtype=state.dtype, **params)
+        if "h" in data:
+            pendulums.h = data["h"].copy()
+        step = int(data["step"])
+        pendulums.step_count = step
+        extra = {name[len("extra_"):]: _to_python(data[name])
+                 for name in data.files if name.startswith("extra_")}
+    return pendulums, step, extra
+
+
+def restore_checkpoint(path, pendulums):
+    """
+    Copies the state saved by save_checkpoint into an existing matrix of the same shape.
+    Returns (step, extra) like load_checkpoint.
+    """
+    saved, step, extra = load_checkpoint(path)
+    if saved.state.shape != pendulums.state.shape:
+        raise ValueError(f"Checkpoint grid {saved.state.shape[1:]} does not match {pendulums.state.shape[1:]}.")
+    pendulums.state[...] = saved.state
+    if pendulums.h is not None:
+        # In place, so the row tiles viewing it (TiledExecutor) keep following it
+        pendulums.h[...] = saved.h if saved.h is not None else np.nan
+    else:
+        pendulums.h = saved.h
+    pendulums.step_count = step
+    return step, extra
+
+
+def _to_python(value):
+    """0-d arrays come back as Python scalars, the others as arrays."""
+    return value.item() if value.ndim == 0 else value
@@ -0,0 +1,108 @@
+import os
+from collections import OrderedDict
+import numpy as np
+
+from pendulum_matrix import compute_colormap
+from frame_writer import frame_to_uint8
+
+
+class ColormapCache:
+    """
+    LRU cache of uint8 RGBA colormap lookup tables keyed by (N, M, colormap name).
+
+    With cache_dir, tables are also persisted as .npy files and reloaded from disk
+    instead of being recomputed by colormap2d.
+    """
+
+    def __init__(self, maxsize=8, cache_dir=None):
+        self.maxsize = maxsize
+        self.cache_dir = cache_dir
+        self._tables = OrderedDict()
+
+    def get(self, N, M, name="cyclic_pinwheel"):
+        key = (N, M, name)
+        if key in self._tables:
+            self._tables.move_to_end(key)
+            return self._tables[key]
+
+        lut = self._load(key)
+        if lut is None:
+            lut = frame_to_uint8(compute_colormap(N, M, name))
+            self._save(key, lut)
+        lut.flags.writeable = False  # Shared between callers
+
+        self._tables[key] = lut
+        if len(self._tables) > self.maxsize:
+            self._tables.popitem(last=False)
+        return lut
+
+    def clear(self):
+        self._tables.clear()
+
+    def _path(self, key):
+        N, M, name = key
+        return os.path.join(self.cache_dir, f"colormap_{name}_{N}x{M}.npy")
+
+    def _load(self, key):
+        if self.cache_dir is None or not os.path.exists(self._path(key)):
+            return None
+        return np.load(self._path(key))
+
+    def _save(self, key, lut):
+        if self.cache_dir is None:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        np.save(self._path(key), lut)
+
+
+# Shared cache, persisted on disk when PENDULUM_COLORMAP_CACHE points to a directory
+colormap_cache = ColormapCache(cache_dir=os.environ.get("PENDULUM_COLORMAP_CACHE"))
+
+
+def get_colormap_lut(N, M, name="cyclic_pinwheel"):
+    """Read-only (N, M, 4) uint8 RGBA lookup table from the shared cache."""
+    return colormap_cache.get(N, M, name)
+
+
+class AngleColorizer:
+    """
+    Maps (θ₁, θ₂) grids to uint8 RGBA frames through a cached lookup table.
+
+    Index computation and lookup write into buffers allocated once, and the returned
+    frame is a reusable buffer overwritten by the next call.
+    The mapping is the one of the optimized animations:
+    i = int((θ₁ + π) / 2π * N) % N, j = int((θ₂ + π) / 2π * M) % M.
+    """
+
+    def __init__(self, N, M, name="cyclic_pinwheel"):
+        self.N = N
+        self.M = M
+        self.lut = get_colormap_lut(N, M, name)
+        self._flat_lut = self.lut.reshape(-1, 4)
+        self._buffers_shape = None
+
+    def _allocate(self, shape):
+        self._scaled = np.empty(shape)
+        self._i = np.empty(shape, dtype=np.intp)
+        self._j = np.empty(shape, dtype=np.intp)
+        self.frame = np.empty(shape + (4,), dtype=np.uint8)
+        self._buffers_shape = shape
+
+    def _indices(self, theta, size, out):
+        np.add(theta, np.pi, out=self._scaled)
+        self._scaled /= 2 * np.pi
+        self._scaled *= size
+        np.copyto(out, self._scaled, casting="unsafe")  # Truncation like astype(int)
+        np.remainder(out, size, out=out)
+
+    def __call__(self, theta1, theta2):
+        shape = np.shape(theta1)
+        if shape != self._buffers_shape:
+            self._allocate(shape)
+
+        self._indices(theta1, self.N, self._i)
+        self._indices(theta2, self.M, self._j)
+        self._i *= self.M
+        self._i += self._j  # Flat index in the lookup table
+        np.take(self._flat_lut, self._i.reshape(-1), axis=0, out=self.frame.reshape(-1, 4))
+        return self.frame
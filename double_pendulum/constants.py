@@ -2,6 +2,10 @@
 ANIMATION_DT = 30  # Screen refresh rate (ms) -> ~60 FPS
 PHYSICS_DT = 0.001    # Physics timestep (s) -> 0.1 ms (for RK4 stability)
 MAX_HISTORY_POINTS = 1000 # Max points for trace and phase plot
+HISTORY_CAPACITY = 20000  # Hard cap on the points of every trace, phase and energy history
+ENSEMBLE_SIZE = 200   # Pendulums launched by the ensemble mode
+ENSEMBLE_SPREAD_DEG = 0.01  # Half-width of the θ₂ perturbations of the ensemble (deg)
+ENSEMBLE_COLORMAP = "turbo"  # Matplotlib colormap spread over the ensemble members
 
 # --- Display Constants (Canvas) ---
 CANVAS_WIDTH_PX = 1800
@@ -1,13 +1,22 @@
+import os
+import contextlib
 import tkinter as tk
 import ttkbootstrap as ttk
 import numpy as np
 from collections import deque
+from matplotlib import colormaps
+from matplotlib.colors import to_hex
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
 from pendulum import Pendulum, SimplePendulum, DoublePendulum
 from constants import *
 from presets import PRESETS
+from instrumentation import instrumentation
+from ring_buffer import RingBuffer
+from physics_worker import PhysicsWorker, take_snapshot
+from blitting import AxesLimits, BlitManager, minmax_decimate
+from ensemble import perturbed_ensemble, sync_ensemble, ensemble_coords
 
 class PendulumApplication():
     
@@ -15,7 +24,11 @@ class PendulumApplication():
     # 1. INITIALISATION AND SETUP
     # =================================================================================
     
-    def __init__(self, root):
+    def __init__(self, root, threaded=False):
+        """
+        threaded=True runs the physics in a PhysicsWorker thread at the wall-clock rate;
+        the Tk loop then only records and draws the snapshots it produces.
+        """
         self.root = root
         self.root.title("Double Pendulum Simulation")
         
@@ -57,7 +70,7 @@ class PendulumApplication():
         self.current_color = COLOR_PALETTE[0][0]
         self.current_outline = COLOR_PALETTE[0][1]
         
-        self.trace_data = []
+        self.trace_data = RingBuffer(2, maxlen=HISTORY_CAPACITY)
         self.stored_traces = []
         self.phase_lines = []
         self.stored_phases = []
@@ -68,8 +81,23 @@ class PendulumApplication():
         self.limit_trace_var = tk.BooleanVar(value=False)
         self.clear_on_reset_var = tk.BooleanVar(value=True)
         
+        # Ensemble mode: perturbed copies integrated together by an OptimizedPendulumMatrix
+        self.ensemble_var = tk.BooleanVar(value=False)
+        self.var_ensemble_size = tk.StringVar(value=str(ENSEMBLE_SIZE))
+        self.var_ensemble_spread = tk.StringVar(value=str(ENSEMBLE_SPREAD_DEG))
+        self.ensemble = None
+        self.ensemble_start = 0.0
+        self.ensemble_ids = []
+        
+        self.snapshot = take_snapshot(self.sim)  # State drawn by draw_frame
+        self.worker = PhysicsWorker(self.sim, self.physics_dt, self.steps_per_frame) if threaded else None
+        # Held while changing the pendulum, so the physics thread never sees half an update
+        self.sim_lock = self.worker.lock if self.worker is not None else contextlib.nullcontext()
+        
         self.create_widgets()
         self.is_running = True
+        if self.worker is not None:
+            self.worker.start()
         self.update_loop()
         
     def create_widgets(self):
@@ -86,6 +114,15 @@ class PendulumApplication():
         self.canvas.bind("<Configure>", self.on_canvas_resize)
         self.pivot_id = self.canvas.create_oval(0, 0, 0, 0, fill= 
                                 SIM_PIVOT_COLOR, outline="")
+        # Items created once and moved with coords() in draw_frame (stored traces go below the current one)
+        self.trace_id = self.canvas.create_line(0, 0, 0, 0, fill=self.current_color, width=2,
+                                                tags="trace", state="hidden")
+        self.rod1_id = self.canvas.create_line(0, 0, 0, 0, fill=SIM_LINE_COLOR, width=LINE_WIDTH)
+        self.bob1_id = self.canvas.create_oval(0, 0, 0, 0, fill=MASS1_FILL, outline=MASS1_OUTLINE, width=2)
+        self.rod2_id = self.canvas.create_line(0, 0, 0, 0, fill=SIM_LINE_COLOR, width=LINE_WIDTH)
+        self.bob2_id = self.canvas.create_oval(0, 0, 0, 0, fill=self.current_color,
+                                               outline=self.current_outline, width=2)
+        self.traces_shown = True
         
         # Middle column: Plots
         graphs_frame = ttk.Frame(main_frame)
@@ -118,12 +155,16 @@ class PendulumApplication():
         self.ax_energy.axvline(0, color=self.theme_fg, linewidth=1.5, alpha=0.5)
         for spine in self.ax_energy.spines.values(): spine.set_edgecolor(self.theme_fg)
         self.line_energy, = self.ax_energy.plot([], [], color=TRACE_COLOR_FADE, lw=1.5)
-        self.add_new_graph_line()
         
         self.fig.tight_layout(pad=2.0)
         self.graph_canvas = FigureCanvasTkAgg(self.fig, master=graphs_frame)
         self.graph_canvas.draw()
         self.graph_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        # Only the current lines are redrawn each frame (blitting), the axes are rescaled when the data leaves them
+        self.phase_limits = AxesLimits(self.ax_phase, x=False)
+        self.energy_limits = AxesLimits(self.ax_energy)
+        self.plot_blitter = BlitManager(self.graph_canvas)
+        self.add_new_graph_line()
         
         # Right column: Controls
         controls_frame = ttk.Labelframe(main_frame, text="Physical Parameters", padding=10)
@@ -151,6 +192,17 @@ class PendulumApplication():
         ttk.Checkbutton(trace_frame, text="Limit Trace", variable=self.limit_trace_var, bootstyle="round-toggle").pack(anchor='w')
         ttk.Checkbutton(trace_frame, text="Delete Trace on Reset", variable=self.clear_on_reset_var, bootstyle="round-toggle").pack(anchor='w')
         
+        # Ensemble frame
+        ensemble_frame = ttk.Labelframe(controls_frame, text="Ensemble", padding=10)
+        ensemble_frame.pack(fill='x', pady=(0, 10))
+        
+        ttk.Checkbutton(ensemble_frame, text="Ensemble Mode", variable=self.ensemble_var, bootstyle="round-toggle",
+                        command=self.toggle_ensemble).grid(row=0, column=0, columnspan=2, sticky='w', pady=(0, 5))
+        ttk.Label(ensemble_frame, text="Pendulums", font=("", 8)).grid(row=1, column=0, padx=5)
+        ttk.Label(ensemble_frame, text="Spread θ₂ (deg)", font=("", 8)).grid(row=1, column=1, padx=5)
+        ttk.Entry(ensemble_frame, textvariable=self.var_ensemble_size, width=8).grid(row=2, column=0, padx=5)
+        ttk.Entry(ensemble_frame, textvariable=self.var_ensemble_spread, width=8).grid(row=2, column=1, padx=5)
+        
         # Adding preset buttons
         presets_frame = ttk.Labelframe(controls_frame, text="Scenarios", padding=10)
         presets_frame.pack(fill='x', pady=(0, 10))
@@ -267,97 +319,128 @@ class PendulumApplication():
         if not self.is_running:
             return
 
-        for _ in range(self.steps_per_frame):
-            self.sim.step(self.physics_dt)
+        instrumentation.tick()
+        if self.worker is None:
+            with instrumentation.stage("physics"):
+                self.sim.step_n(self.physics_dt, self.steps_per_frame)
+            instrumentation.count("steps", self.steps_per_frame)
+            instrumentation.count("cell_steps", self.steps_per_frame)
+            snapshots = [take_snapshot(self.sim)]
+        else:
+            # Every snapshot goes to the histories, only the latest one is drawn
+            snapshots = self.worker.drain()
+            if not snapshots:
+                self.root.after(self.animation_dt_ms, self.update_loop)
+                return
+
+        for snapshot in snapshots:
+            self.record_snapshot(snapshot)
+        self.snapshot = snapshots[-1]
+        
+        if self.ensemble is not None:
+            with instrumentation.stage("ensemble"):
+                n_steps = sync_ensemble(self.ensemble, self.sim, self.snapshot.time, self.physics_dt,
+                                        self.ensemble_start)
+            instrumentation.count("cell_steps", n_steps * self.ensemble.N)
+        
+        # Visual updates (full figure redraws only when the axes limits change)
+        with instrumentation.stage("matplotlib"):
+            rescale = False
+            if self.phase_lines and self.stored_phases:
+                data = self.stored_phases[-1].values()
+                if len(data) > 0:
+                    self.phase_lines[-1].set_data(data[:,0], data[:,1])
+                    rescale |= self.phase_limits.update(data[:,0], data[:,1])
+                    
+            if self.energy_lines and self.stored_energies:
+                data_e = self.stored_energies[-1].values()
+                if len(data_e) > 0:
+                    # A min/max pair per pixel column draws the same curve as the whole history
+                    t, e = minmax_decimate(data_e[:,0], data_e[:,1], self.ax_energy.bbox.width)
+                    self.energy_lines[-1].set_data(t, e)
+                    rescale |= self.energy_limits.update(t, e)
+            
+            self.plot_blitter.update(full=rescale)
+        with instrumentation.stage("canvas"):
+            self.draw_frame()
+        
+        self.energy_label.config(text=f"Total Energy: {self.snapshot.energy:.2f} J")
+        self.root.after(self.animation_dt_ms, self.update_loop)
 
-        # Acquiring data
-        _, (x2, y2) = self.sim.get_cartesian_coords()
-        theta2_rad, omega2 = self.sim.Y[2:4]
-        theta2_deg = self.normalize_angle(theta2_rad)
-        current_energy = self.sim.get_energy()
-        time = self.sim.time_elapsed
+    def record_snapshot(self, snapshot):
+        theta2_deg = self.normalize_angle(snapshot.theta2)
         
-        # Data storage
-        self.trace_data.append((x2, y2))
+        # Data storage: histories keep their last HISTORY_CAPACITY points, or max_trace_length with "Limit Trace"
+        maxlen = self.max_trace_length if self.limit_trace_var.get() else HISTORY_CAPACITY
+        self.trace_data.maxlen = maxlen
+        self.trace_data.append((snapshot.x2, snapshot.y2))
         
         if self.stored_phases:
             if self.stored_phases[-1]:
                 prev_theta = self.stored_phases[-1][-1][0]
                 if abs(theta2_deg - prev_theta) > 300:
                     self.stored_phases[-1].append((np.nan, np.nan))
-            self.stored_phases[-1].append((theta2_deg, omega2))
+            self.stored_phases[-1].maxlen = maxlen
+            self.stored_phases[-1].append((theta2_deg, snapshot.omega2))
         
         if self.stored_energies:
-            self.stored_energies[-1].append((time, current_energy))
-        
-        if self.limit_trace_var.get():
-            if len(self.trace_data) > self.max_trace_length:
-                self.trace_data.pop(0)
-                
-            if self.stored_phases and len(self.stored_phases[-1]) > self.max_trace_length:
-                self.stored_phases[-1].pop(0)
-                
-            if self.stored_energies and len(self.stored_energies[-1]) > self.max_trace_length:
-                self.stored_energies[-1].pop(0)
-        
-        # Visual updates
-        if self.phase_lines and self.stored_phases:
-            data = np.array(self.stored_phases[-1])
-            if len(data) > 0:
-                self.phase_lines[-1].set_data(data[:,0], data[:,1])
-                
-        if self.energy_lines and self.stored_energies:
-            data_e = np.array(self.stored_energies[-1])
-            if len(data_e) > 0:
-                self.energy_lines[-1].set_data(data_e[:,0], data_e[:,1])
-        
-        self.ax_phase.relim()
-        self.ax_phase.autoscale_view()
-        self.ax_energy.relim()
-        self.ax_energy.autoscale_view()
-        self.graph_canvas.draw_idle()
-        self.draw_frame()
-        
-        self.energy_label.config(text=f"Total Energy: {current_energy:.2f} J")
-        self.root.after(self.animation_dt_ms, self.update_loop)
+            self.stored_energies[-1].maxlen = maxlen
+            self.stored_energies[-1].append((snapshot.time, snapshot.energy))
     
     def draw_frame(self):
-        self.canvas.delete("moving_item")
+        # Traces: stored ones are only reprojected on resize, the current one is moved
+        show_trace = self.show_trace_var.get()
+        if show_trace != self.traces_shown:
+            self.canvas.itemconfigure("trace", state="normal" if show_trace else "hidden")
+            self.traces_shown = show_trace
 
-        # Draw Traces
-        if self.show_trace_var.get():
-            for trace in self.stored_traces:
-                if len(trace['points']) > 1:
-                    pts = []
-                    for px, py in trace['points']:
-                        cx, cy = self.physics_to_canvas(px, py)
-                        pts.extend([cx, cy])
-                    self.canvas.create_line(*pts, fill=trace['color'], width=1, tags="moving_item")
-
-            # Draw Current Trace
-            if len(self.trace_data) > 1:
-                pixel_points = []
-                for px, py in self.trace_data:
-                    cx, cy = self.physics_to_canvas(px, py)
-                    pixel_points.extend([cx, cy])
-                self.canvas.create_line(*pixel_points, fill=self.current_color, width=2, tags="moving_item")
+        if show_trace and len(self.trace_data) > 1:
+            self.canvas.coords(self.trace_id, self.project_points(self.trace_data.values()))
+            self.canvas.itemconfigure(self.trace_id, state="normal")
+        else:
+            self.canvas.itemconfigure(self.trace_id, state="hidden")
+        
+        # Ensemble members, all projected at once, one polyline item each
+        if self.ensemble is not None:
+            x1, y1, x2, y2 = ensemble_coords(self.ensemble)
+            pixels = np.empty((self.ensemble.N, 3, 2))
+            pixels[:, 0] = (0.0, 0.0)
+            pixels[:, 1, 0], pixels[:, 1, 1] = x1, y1
+            pixels[:, 2, 0], pixels[:, 2, 1] = x2, y2
+            pixels *= (self.current_pixels_per_meter, -self.current_pixels_per_meter)
+            pixels += (self.current_pivot_x, self.current_pivot_y)
+            for item, coords in zip(self.ensemble_ids, pixels.reshape(self.ensemble.N, 6).tolist()):
+                self.canvas.coords(item, coords)
         
         # Draw pendulum
-        (x1, y1), (x2, y2) = self.sim.get_cartesian_coords()
-        (x1_pix, y1_pix) = self.physics_to_canvas(x1, y1)
-        (x2_pix, y2_pix) = self.physics_to_canvas(x2, y2)
-        
-        self.canvas.create_line(self.current_pivot_x, self.current_pivot_y, x1_pix, y1_pix, 
-                                fill=SIM_LINE_COLOR, width=LINE_WIDTH, tags="moving_item")
-        self.canvas.create_oval(x1_pix - MASS_RADIUS, y1_pix - MASS_RADIUS,
-                                x1_pix + MASS_RADIUS, y1_pix + MASS_RADIUS,
-                                fill=MASS1_FILL, outline=MASS1_OUTLINE, width=2, tags="moving_item")
-        
-        self.canvas.create_line(x1_pix, y1_pix, x2_pix, y2_pix, 
-                                fill=SIM_LINE_COLOR, width=LINE_WIDTH, tags="moving_item")
-        self.canvas.create_oval(x2_pix - MASS_RADIUS, y2_pix - MASS_RADIUS,
-                                x2_pix + MASS_RADIUS, y2_pix + MASS_RADIUS,
-                                fill=self.current_color, outline=self.current_outline, width=2, tags="moving_item")
+        (x1_pix, y1_pix) = self.physics_to_canvas(self.snapshot.x1, self.snapshot.y1)
+        (x2_pix, y2_pix) = self.physics_to_canvas(self.snapshot.x2, self.snapshot.y2)
+        
+        self.canvas.coords(self.rod1_id, self.current_pivot_x, self.current_pivot_y, x1_pix, y1_pix)
+        self.canvas.coords(self.bob1_id, x1_pix - MASS_RADIUS, y1_pix - MASS_RADIUS,
+                           x1_pix + MASS_RADIUS, y1_pix + MASS_RADIUS)
+        self.canvas.coords(self.rod2_id, x1_pix, y1_pix, x2_pix, y2_pix)
+        self.canvas.coords(self.bob2_id, x2_pix - MASS_RADIUS, y2_pix - MASS_RADIUS,
+                           x2_pix + MASS_RADIUS, y2_pix + MASS_RADIUS)
+
+    def store_current_trace(self):
+        """Freezes the current trace into its own canvas line, drawn under the new current trace."""
+        if len(self.trace_data) > 1:
+            points = self.trace_data.values().copy()
+            item = self.canvas.create_line(self.project_points(points), fill=self.current_color,
+                                           width=1, tags="trace",
+                                           state="normal" if self.traces_shown else "hidden")
+            self.canvas.tag_lower(item, self.trace_id)
+            self.stored_traces.append({'points': points, 'color': self.current_color,
+                                       'item': item})
+
+    def redraw_stored_traces(self):
+        for trace in self.stored_traces:
+            self.canvas.coords(trace['item'], self.project_points(trace['points']))
+
+    def update_current_colors(self):
+        self.canvas.itemconfigure(self.trace_id, fill=self.current_color)
+        self.canvas.itemconfigure(self.bob2_id, fill=self.current_color, outline=self.current_outline)
 
     # =================================================================================
     # 3. CONTROL LOGIC
@@ -370,67 +453,117 @@ class PendulumApplication():
         w2 = float(self.var_omega2.get())
             
         Y0 = np.array([np.deg2rad(t1), w1, np.deg2rad(t2), w2])
-        self.sim.set_initial_conditions(Y0)
-        
-        self.sim.reset()
+        with self.sim_lock:
+            self.sim.set_initial_conditions(Y0)
+            
+            self.sim.reset()
+            self.snapshot = take_snapshot(self.sim)
+            if self.worker is not None:
+                self.worker.drain()  # Snapshots of the previous run
+            if self.ensemble_var.get():
+                self.start_ensemble()
         
         if self.clear_on_reset_var.get():
-            self.trace_data = []
+            self.trace_data.clear()
+            for trace in self.stored_traces: self.canvas.delete(trace['item'])
             self.stored_traces = []
             self.color_idx = 0
             for line in self.phase_lines: line.remove()
             self.phase_lines = []
             for line in self.energy_lines: line.remove()
             self.energy_lines = []
+            self.phase_limits.clear()
+            self.energy_limits.clear()
             self.current_color = COLOR_PALETTE[0][0]
             self.current_outline = COLOR_PALETTE[0][1]
             self.add_new_graph_line()
 
             
         else:
-            if self.trace_data:
-                self.stored_traces.append({'points': list(self.trace_data), 'color': self.current_color})
-            self.trace_data = []
+            self.store_current_trace()
+            self.trace_data.clear()
             self.color_idx  =(self.color_idx + 1) % len(COLOR_PALETTE)
             self.current_color = COLOR_PALETTE[self.color_idx][0]
             self.current_outline = COLOR_PALETTE[self.color_idx][1]
             self.add_new_graph_line()
             
+        self.update_current_colors()
         self.draw_frame()
 
-        current_energy = self.sim.get_energy()
-        self.energy_label.config(text=f"Total Energy: {current_energy:.2f} J")
+        self.energy_label.config(text=f"Total Energy: {self.snapshot.energy:.2f} J")
 
         if not self.is_running:
             self.is_running = True
             self.pause_button.config(text="Pause", bootstyle="warning")
+            if self.worker is not None:
+                self.worker.resume()
             self.update_loop()
 
     def toggle_pause(self):
         self.is_running = not self.is_running
         if self.is_running:
             self.pause_button.config(text="Pause", bootstyle="warning")
+            if self.worker is not None:
+                self.worker.resume()
             self.update_loop()
         else:
             self.pause_button.config(text="Resume", bootstyle="success")
+            if self.worker is not None:
+                self.worker.pause()
+
+    def toggle_ensemble(self):
+        with self.sim_lock:
+            if self.ensemble_var.get():
+                self.start_ensemble()
+            else:
+                self.stop_ensemble()
+        self.draw_frame()
+
+    def start_ensemble(self):
+        """Launches the ensemble around the current state of the main pendulum (drawn on top of it)."""
+        try:
+            n = max(1, int(self.var_ensemble_size.get()))
+            spread = float(self.var_ensemble_spread.get())
+        except ValueError:
+            n, spread = ENSEMBLE_SIZE, ENSEMBLE_SPREAD_DEG
+        self.stop_ensemble()
+        self.ensemble = perturbed_ensemble(self.sim, n, spread, Y=self.sim.Y.copy())
+        self.ensemble_start = self.sim.time_elapsed
+        
+        colors = colormaps[ENSEMBLE_COLORMAP](np.linspace(0, 1, n, endpoint=False))
+        for color in colors:
+            item = self.canvas.create_line(0, 0, 0, 0, 0, 0, fill=to_hex(color), width=2,
+                                           capstyle=tk.ROUND, joinstyle=tk.ROUND, tags="ensemble")
+            self.ensemble_ids.append(item)
+        self.canvas.tag_lower("ensemble", self.rod1_id)
+
+    def stop_ensemble(self):
+        self.canvas.delete("ensemble")
+        self.ensemble_ids = []
+        self.ensemble = None
+
+    def stop_physics(self):
+        if self.worker is not None:
+            self.worker.stop()
     
     def apply_preset(self,t1,w1,t2,w2,l1,m1,l2,m2,g,gamma):
         self.var_theta1.set(str(t1))
         self.var_omega1.set(str(w1))
         self.var_theta2.set(str(t2))
         self.var_omega2.set(str(w2))
-        self.sim.set_l1(l1)
-        self.l1_slider.set(l1)
-        self.sim.set_m1(m1)
-        self.m1_slider.set(m1)
-        self.sim.set_l2(l2)
-        self.l2_slider.set(l2)
-        self.sim.set_m2(m2)
-        self.m2_slider.set(m2)
-        self.sim.set_gravity(g)
-        self.g_slider.set(g)
-        self.sim.set_gamma(gamma)
-        self.gamma_slider.set(gamma)
+        with self.sim_lock:
+            self.sim.set_l1(l1)
+            self.l1_slider.set(l1)
+            self.sim.set_m1(m1)
+            self.m1_slider.set(m1)
+            self.sim.set_l2(l2)
+            self.l2_slider.set(l2)
+            self.sim.set_m2(m2)
+            self.m2_slider.set(m2)
+            self.sim.set_gravity(g)
+            self.g_slider.set(g)
+            self.sim.set_gamma(gamma)
+            self.gamma_slider.set(gamma)
         self.reset_simulation()
     
     def apply_selected_preset(self):
@@ -440,39 +573,50 @@ class PendulumApplication():
             self.apply_preset(**target_preset["params"])
     
     def add_new_graph_line(self):
-        self.stored_phases.append([])
-        self.stored_energies.append([])
+        # The previous lines stay on screen as part of the background
+        if self.phase_lines:
+            self.phase_limits.freeze(*self.phase_lines[-1].get_data())
+            self.energy_limits.freeze(*self.energy_lines[-1].get_data())
+        self.stored_phases.append(RingBuffer(2, maxlen=HISTORY_CAPACITY))
+        self.stored_energies.append(RingBuffer(2, maxlen=HISTORY_CAPACITY))
         phase_line, = self.ax_phase.plot([], [], color=self.current_color, lw=1)
         self.phase_lines.append(phase_line)
         energy_line, = self.ax_energy.plot([], [], color=self.current_outline, lw=1.5)
         self.energy_lines.append(energy_line)
+        self.plot_blitter.set_artists([phase_line, energy_line])
 
     # =================================================================================
     # 4.EVENT HELDERS (CALLBACKS)
     # =================================================================================
 
     def _on_g_slide(self, value):
-        self.sim.set_gravity(float(value))
+        with self.sim_lock:
+            self.sim.set_gravity(float(value))
         self.g_label.config(text=f"g : {self.sim.g:.2f} m⋅s⁻²")
 
     def _on_gamma_slide(self, value):
-        self.sim.set_gamma(float(value))
+        with self.sim_lock:
+            self.sim.set_gamma(float(value))
         self.gamma_label.config(text=f"γ : {self.sim.gamma:.2f} s⁻¹")
 
     def _on_l1_slide(self, value):
-        self.sim.set_l1(float(value))
+        with self.sim_lock:
+            self.sim.set_l1(float(value))
         self.l1_label.config(text=f"l₁ : {self.sim.l1:.2f} m")
  
     def _on_m1_slide(self, value):
-        self.sim.set_m1(float(value))
+        with self.sim_lock:
+            self.sim.set_m1(float(value))
         self.m1_label.config(text=f"m₁ : {self.sim.m1:.2f} kg")
 
     def _on_l2_slide(self, value):
-        self.sim.set_l2(float(value))
+        with self.sim_lock:
+            self.sim.set_l2(float(value))
         self.l2_label.config(text=f"l₂ : {self.sim.l2:.2f} m")
 
     def _on_m2_slide(self, value):
-        self.sim.set_m2(float(value))
+        with self.sim_lock:
+            self.sim.set_m2(float(value))
         self.m2_label.config(text=f"m₂ : {self.sim.m2:.2f} kg")
 
     def on_preset_combo_change(self, event):
@@ -496,6 +640,7 @@ class PendulumApplication():
         self.canvas.coords(self.pivot_id, 
                            self.current_pivot_x - PIVOT_RADIUS, self.current_pivot_y - PIVOT_RADIUS,
                            self.current_pivot_x + PIVOT_RADIUS, self.current_pivot_y + PIVOT_RADIUS)
+        self.redraw_stored_traces()
         if not self.is_running: self.draw_frame()
     
     # =================================================================================
@@ -507,11 +652,23 @@ class PendulumApplication():
         y_pix = self.current_pivot_y - y * self.current_pixels_per_meter
         return (x_pix, y_pix)
 
+    def project_points(self, points):
+        """Flat [x0, y0, x1, y1, ...] canvas coordinates of a sequence of (x, y) physics points."""
+        pixels = np.array(points, dtype=float).reshape(-1, 2)
+        pixels *= (self.current_pixels_per_meter, -self.current_pixels_per_meter)
+        pixels += (self.current_pivot_x, self.current_pivot_y)
+        return pixels.ravel().tolist()
+
     def normalize_angle(self, theta_rad):
         deg = np.rad2deg(theta_rad)
         return ((deg + 180) % 360) - 180
     
-def start_application():
+def start_application(threaded=False):
     root = ttk.Window(themename="flatly") 
-    app = PendulumApplication(root)
-    root.mainloop()
\ No newline at end of file
+    app = PendulumApplication(root, threaded=threaded)
+    root.mainloop()
+    app.stop_physics()
+    if instrumentation.enabled:
+        print(instrumentation.summary())
+        if os.environ.get("PENDULUM_INSTRUMENTATION_JSON"):
+            instrumentation.export_json(os.environ["PENDULUM_INSTRUMENTATION_JSON"])
\ No newline at end of file
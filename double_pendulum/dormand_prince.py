@@ -0,0 +1,82 @@
+import numpy as np
+
+# Dormand-Prince 5(4) Butcher tableau
+C = np.array([0.0, 1/5, 3/10, 4/5, 8/9, 1.0, 1.0])
+A = [
+    [],
+    [1/5],
+    [3/40, 9/40],
+    [44/45, -56/15, 32/9],
+    [19372/6561, -25360/2187, 64448/6561, -212/729],
+    [9017/3168, -355/33, 46732/5247, 49/176, -5103/18656],
+]
+B = np.array([35/384, 0.0, 500/1113, 125/192, -2187/6784, 11/84, 0.0])
+# Difference between the 5th and the embedded 4th order weights
+E = np.array([71/57600, 0.0, -71/16695, 71/1920, -17253/339200, 22/525, -1/40])
+
+SAFETY = 0.9
+MIN_FACTOR = 0.2
+MAX_FACTOR = 5.0
+
+
+def dopri45_advance(f, Y, duration, h, rtol=1e-6, atol=1e-9):
+    """
+    Advances every column of Y by `duration` with its own adaptive step size.
+
+    Y has shape (dim, n) and is updated in place, h has shape (n,) and holds the
+    step size guesses (updated in place for the next call). f(y, columns) maps the
+    (dim, k) states of the given column indices to their derivatives. Columns that have reached `duration` are dropped
+    from the working set, so cells in calm regions stop costing evaluations early.
+    Returns the number of derivative evaluations made for each column.
+    """
+    n = Y.shape[1]
+    t = np.zeros(n)
+    nfev = np.ones(n, dtype=np.int64)
+    active = np.arange(n)
+    k_first = f(Y, active)  # First-same-as-last: refreshed from the 7th stage of each accepted step
+
+    while active.size:
+        y = Y[:, active]
+        h_active = h[active]
+        remaining = duration - t[active]
+        last = h_active >= remaining
+        hh = np.where(last, remaining, h_active)
+        if np.any(hh <= 1e-14 * duration):
+            raise RuntimeError("Step size underflow in dopri45_advance, tolerances too tight.")
+
+        k = [k_first[:, active]]
+        for i in range(1, 7):
+            y_stage = y.copy()
+            weights = A[i] if i < 6 else B[:6]
+            for a_ij, k_j in zip(weights, k):
+                if a_ij != 0.0:
+                    y_stage += (hh * a_ij) * k_j
+            if i == 6:
+                y_new = y_stage
+            k.append(f(y_stage, active))
+        nfev[active] += 6
+
+        err = np.zeros_like(y)
+        for e_i, k_i in zip(E, k):
+            if e_i != 0.0:
+                err += e_i * k_i
+        err *= hh
+        scale = atol + rtol * np.maximum(np.abs(y), np.abs(y_new))
+        err_norm = np.sqrt(np.mean((err / scale)**2, axis=0))
+
+        accept = err_norm <= 1.0
+        accepted = active[accept]
+        Y[:, accepted] = y_new[:, accept]
+        t[accepted] += hh[accept]
+        k_first[:, accepted] = k[6][:, accept]
+
+        with np.errstate(divide="ignore"):
+            factor = np.clip(SAFETY * err_norm**-0.2, MIN_FACTOR, MAX_FACTOR)
+        h_new = hh * factor
+        # A step shortened to land on `duration` must not shrink the next guess
+        keep = accept & last & (h_new < h_active)
+        h[active] = np.where(keep, h_active, h_new)
+
+        active = active[~(accept & last)]
+
+    return nfev
@@ -0,0 +1,42 @@
+import numpy as np
+
+from optimized_pendulum_matrix import OptimizedPendulumMatrix, PARAMETERS
+
+
+def perturbed_ensemble(sim, n, spread_deg, Y=None):
+    """
+    (n, 1) OptimizedPendulumMatrix of copies of a DoublePendulum whose θ₂ are shifted by
+    n evenly spaced offsets in [-spread_deg, spread_deg] degrees, so the members start
+    indistinguishable and fan out at the rate set by the chaos of the initial state.
+
+    The copies start from Y (default: the current state of sim) with its parameters.
+    """
+    Y = sim.Y if Y is None else Y
+    offsets = np.deg2rad(np.linspace(-spread_deg, spread_deg, n)) if n > 1 else np.zeros(1)
+    theta2 = (Y[2] + offsets)[:, None]
+    return OptimizedPendulumMatrix(n, 1, Y[0], theta2, Y[1], Y[3],
+                                   **{name: getattr(sim, name) for name in PARAMETERS})
+
+
+def sync_ensemble(ensemble, sim, time, dt, start_time=0.0):
+    """
+    Copies the current parameters of sim (sliders) to the ensemble and advances it to
+    the simulated time `time` in steps of dt, start_time being the time of its initial
+    state. Returns the number of steps taken.
+    """
+    for name in PARAMETERS:
+        setattr(ensemble, name, getattr(sim, name))
+    n_steps = int(round((time - start_time) / dt)) - ensemble.step_count
+    if n_steps > 0:
+        ensemble.run(dt, n_steps)
+    return max(n_steps, 0)
+
+
+def ensemble_coords(ensemble):
+    """Positions of the two bobs of every member (same convention as DoublePendulum.get_cartesian_coords)."""
+    theta1, theta2 = ensemble.theta1[:, 0], ensemble.theta2[:, 0]
+    x1 = ensemble.l1 * np.sin(theta1)
+    y1 = -ensemble.l1 * np.cos(theta1)
+    x2 = x1 + ensemble.l2 * np.sin(theta2)
+    y2 = y1 - ensemble.l2 * np.cos(theta2)
+    return x1, y1, x2, y2
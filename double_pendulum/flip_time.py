@@ -0,0 +1,67 @@
+import numpy as np
+
+
+def flip_energy_threshold(m1, m2, l1, l2, g):
+    """
+    Lowest total energy at which an arm can go over the top (θ₁ = ±π or θ₂ = ±π).
+    Energy never increases (gamma >= 0), so cells below it can never flip.
+    """
+    arm1 = (m1 + m2) * g * l1 - m2 * g * l2   # θ₁ = π, second arm hanging down
+    arm2 = m2 * g * l2 - (m1 + m2) * g * l1   # θ₂ = π, first arm hanging down
+    return np.minimum(arm1, arm2)
+
+
+def flip_time_map(pendulums, dt=1e-3, T=10.0, compact_ratio=0.2):
+    """
+    Time until the first flip of either arm (|θ₁| or |θ₂| going past π) for every cell.
+
+    Energetically forbidden cells are excluded before integrating. The remaining cells are
+    integrated as a compact (n, 1) matrix that is rebuilt with only the still-unflipped
+    cells once compact_ratio of it has flipped, so the cost shrinks as the run goes on.
+    `pendulums` itself is left untouched.
+
+    Returns (flip_time, forbidden): flip_time is an (N, M) array with np.inf for cells
+    that did not flip within T, forbidden flags the cells excluded by the energy criterion.
+    """
+    shape = pendulums.state.shape[1:]
+    flip_time = np.full(shape, np.inf)
+    flat_flip_time = flip_time.reshape(-1)
+
+    threshold = flip_energy_threshold(pendulums.m1, pendulums.m2, pendulums.l1, pendulums.l2, pendulums.g)
+    forbidden = pendulums.get_energy() < threshold
+
+    theta1, _, theta2, _ = pendulums.state
+    already_flipped = ((np.abs(theta1) > np.pi) | (np.abs(theta2) > np.pi)) & ~forbidden
+    flip_time[already_flipped] = 0.0
+
+    indices = np.flatnonzero(~(forbidden | already_flipped))
+    active = pendulums.take(indices)
+    alive = np.ones(indices.size, dtype=bool)
+    flipped_since_compaction = 0
+
+    n_steps = int(T / dt)
+    for step in range(1, n_steps + 1):
+        if indices.size == 0:
+            break
+        active.step(dt)
+
+        theta1 = active.theta1[:, 0]
+        theta2 = active.theta2[:, 0]
+        new_flips = alive & ((np.abs(theta1) > np.pi) | (np.abs(theta2) > np.pi))
+        n_new = np.count_nonzero(new_flips)
+        if n_new == 0:
+            continue
+
+        flat_flip_time[indices[new_flips]] = step * dt
+        alive &= ~new_flips
+        flipped_since_compaction += n_new
+
+        # Drop the flipped cells from the integration once enough of them piled up
+        if flipped_since_compaction >= compact_ratio * indices.size:
+            keep = np.flatnonzero(alive)
+            indices = indices[keep]
+            active = active.take(keep)
+            alive = np.ones(indices.size, dtype=bool)
+            flipped_since_compaction = 0
+
+    return flip_time, forbidden
@@ -0,0 +1,96 @@
+import os
+import numpy as np
+import imageio.v2 as imageio
+from PIL import Image, GifImagePlugin
+
+from instrumentation import instrumentation
+
+
+def frame_to_uint8(frame, out=None):
+    """Converts a float RGBA frame in [0, 1] to uint8 (same rounding as np.clip(frame * 255, 0, 255).astype(np.uint8))."""
+    if out is None:
+        out = np.empty(frame.shape, dtype=np.uint8)
+    scaled = np.multiply(frame, 255)
+    np.clip(scaled, 0, 255, out=scaled)
+    np.copyto(out, scaled, casting="unsafe")
+    return out
+
+
+class _GifStream:
+    """
+    Animated GIF written one frame at a time (Pillow only writes GIF files on close,
+    keeping every frame in memory). Each frame gets its own 256-colour palette.
+    """
+
+    def __init__(self, filename, fps):
+        self._file = open(filename, "wb")
+        self.duration = 1000 / fps  # ms
+        self._header_written = False
+
+    def append_data(self, image):
+        frame = Image.fromarray(np.ascontiguousarray(image[..., :3])).quantize()
+        if not self._header_written:
+            header, _ = GifImagePlugin.getheader(frame, info={"loop": 0})
+            self._file.writelines(header)
+            self._header_written = True
+        self._file.writelines(GifImagePlugin.getdata(frame, duration=self.duration, include_color_table=True))
+
+    def close(self):
+        self._file.write(b";")  # GIF trailer
+        self._file.close()
+
+
+class FrameWriter:
+    """
+    Streams frames to disk as they are produced instead of buffering a whole animation.
+
+    The output format follows the filename:
+    - "name.gif": animated GIF,
+    - "name.mp4" (or any video extension supported by imageio-ffmpeg): video,
+    - "name" without extension: directory of numbered PNG files.
+    Every format is written frame by frame with a constant memory footprint.
+    """
+
+    def __init__(self, filename, fps, start_frame=0):
+        self.filename = filename
+        self.fps = fps
+        self.frame_count = start_frame  # Lets a resumed run continue a PNG sequence
+        self._buffer = None
+
+        extension = os.path.splitext(filename)[1].lower()
+        if extension == "":
+            os.makedirs(filename, exist_ok=True)
+            self._writer = None
+        elif extension == ".gif":
+            self._writer = _GifStream(filename, fps)
+        else:
+            self._writer = imageio.get_writer(filename, mode="I", fps=fps)
+
+    def append(self, frame):
+        """Writes a uint8 frame, or a float RGBA frame in [0, 1] converted to uint8."""
+        if frame.dtype == np.uint8:
+            image = frame
+        else:
+            if self._buffer is None or self._buffer.shape != frame.shape:
+                self._buffer = np.empty(frame.shape, dtype=np.uint8)
+            with instrumentation.stage("uint8"):
+                image = frame_to_uint8(frame, out=self._buffer)
+
+        with instrumentation.stage("encoding"):
+            if self._writer is None:
+                imageio.imwrite(os.path.join(self.filename, f"frame_{self.frame_count:05d}.png"), image)
+            else:
+                self._writer.append_data(image)
+        self.frame_count += 1
+
+    def close(self):
+        if self._writer is not None:
+            with instrumentation.stage("encoding"):  # Finishes video files
+                self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,148 @@
+import os
+import json
+import time
+from collections import deque
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+class _NullStage:
+    """Shared no-op context manager returned while instrumentation is disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    def __init__(self, stats):
+        self.stats = stats
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stats[0] += 1
+        self.stats[1] += time.perf_counter() - self.start
+        return False
+
+
+class Instrumentation:
+    """
+    Opt-in timers and counters for the hot paths (animations, display loop).
+
+    with instrumentation.stage("integration"): ... accumulates the calls and time of a
+    stage, count("steps", n) increments a counter and tick() records the time between
+    two frames. While disabled, stage() returns a shared no-op context manager and the
+    other methods return immediately, so instrumented code runs at full speed.
+    report() gives stage times, steps/s and cells·steps/s over the wall time since
+    enable(), frame time percentiles and the peak memory, export_json() saves it.
+    """
+
+    def __init__(self, enabled=False, max_frames=100000):
+        self.max_frames = max_frames
+        self.enabled = False
+        self.reset()
+        if enabled:
+            self.enable()
+
+    def reset(self):
+        self.stages = {}
+        self.counters = {}
+        self.frame_times = deque(maxlen=self.max_frames)
+        self._last_tick = None
+        self._started = time.perf_counter()
+
+    def enable(self):
+        """Starts a new measurement session (previous measurements are discarded)."""
+        self.reset()
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def stage(self, name):
+        if not self.enabled:
+            return _NULL_STAGE
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = [0, 0.0]  # calls, total seconds
+        return _Stage(stats)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def tick(self):
+        """Marks the end of a frame; the interval since the previous tick is a frame time."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self._last_tick is not None:
+            self.frame_times.append(now - self._last_tick)
+        self._last_tick = now
+
+    def report(self):
+        """Summary of the session as a JSON-serialisable dict."""
+        wall_time = time.perf_counter() - self._started
+        stages = {name: {"calls": calls, "total_s": total, "mean_s": total / calls if calls else 0.0,
+                         "share": total / wall_time if wall_time > 0 else 0.0}
+                  for name, (calls, total) in self.stages.items()}
+        rates = {name + "_per_second": value / wall_time if wall_time > 0 else 0.0
+                 for name, value in self.counters.items()}
+
+        frames = {"count": len(self.frame_times)}
+        if self.frame_times:
+            times = np.fromiter(self.frame_times, dtype=float)
+            frames.update({"mean_s": float(times.mean()), "p50_s": float(np.percentile(times, 50)),
+                           "p90_s": float(np.percentile(times, 90)), "p99_s": float(np.percentile(times, 99)),
+                           "max_s": float(times.max()), "fps": float(1.0 / times.mean())})
+
+        return {"wall_time_s": wall_time, "stages": stages, "counters": dict(self.counters),
+                "rates": rates, "frames": frames, "peak_memory_mb": peak_memory_mb()}
+
+    def summary(self):
+        """Human-readable version of report()."""
+        report = self.report()
+        lines = [f"Wall time: {report['wall_time_s']:.3f} s"]
+        for name, stage in sorted(report["stages"].items(), key=lambda item: -item[1]["total_s"]):
+            lines.append(f"  {name:16s} {stage['total_s']:9.3f} s  {100 * stage['share']:5.1f}%  "
+                         f"{stage['calls']:8d} calls  {1e3 * stage['mean_s']:9.3f} ms/call")
+        for name, rate in report["rates"].items():
+            lines.append(f"  {name:28s} {rate:14.1f}")
+        frames = report["frames"]
+        if frames["count"]:
+            lines.append(f"  frames: {frames['count']}  p50 {1e3 * frames['p50_s']:.2f} ms  "
+                         f"p90 {1e3 * frames['p90_s']:.2f} ms  p99 {1e3 * frames['p99_s']:.2f} ms  "
+                         f"({frames['fps']:.1f} fps)")
+        if report["peak_memory_mb"] is not None:
+            lines.append(f"  peak memory: {report['peak_memory_mb']:.1f} MB")
+        return "\n".join(lines)
+
+    def export_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+
+def peak_memory_mb():
+    """Peak resident memory of the process in MB, None where it cannot be measured."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / 2**20 if os.uname().sysname == "Darwin" else peak / 2**10
+
+
+# Shared instance used by the animations and the display, enabled with PENDULUM_INSTRUMENTATION=1
+instrumentation = Instrumentation(enabled=os.environ.get("PENDULUM_INSTRUMENTATION", "0") not in ("", "0"))
@@ -1,7 +1,11 @@
+import copy
 import numpy as np 
 import time 
 from numpy import sin, cos
 
+from dormand_prince import dopri45_advance
+from symplectic import SYMPLECTIC_METHODS, symplectic_step
+
 m1 = 1.0 # mass of first pendulum bob
 m2 = 1.0 # mass of second pendulum bob
 l1 = 1.0 # length of first rod
@@ -59,33 +63,345 @@ def rk4_step(theta1, theta2, omega1, omega2, dt):
 
     return theta1_new, theta2_new, omega1_new, omega2_new 
 
+def derivatives_into(Y, out, scratch, m1, m2, l1, l2, g, gamma):
+    """
+    Writes dY/dt into out without allocating (same equations as DoublePendulum.derivative).
+    Y and out have shape (4, ...), scratch has shape (9, ...).
+    """
+    theta1, omega1, theta2, omega2 = Y
+    sin_delta, cos_delta, denom, w1_sq, w2_sq, sin1, sin2, t, u = scratch
+
+    np.subtract(theta1, theta2, out=sin_delta)
+    np.cos(sin_delta, out=cos_delta)
+    np.sin(sin_delta, out=sin_delta)
+    np.sin(theta1, out=sin1)
+    np.sin(theta2, out=sin2)
+    np.multiply(omega1, omega1, out=w1_sq)
+    np.multiply(omega2, omega2, out=w2_sq)
+
+    # l1 * (m1 + m2 * sin_delta**2), shared by both accelerations
+    np.multiply(sin_delta, sin_delta, out=denom)
+    denom *= m2
+    denom += m1
+
+    d_omega1 = out[1]
+    np.multiply(w1_sq, cos_delta, out=t)
+    t *= l1
+    np.multiply(w2_sq, l2, out=u)
+    t += u
+    t *= sin_delta
+    t *= m2
+    np.multiply(sin2, cos_delta, out=d_omega1)
+    d_omega1 *= m2 * g
+    d_omega1 -= t
+    np.multiply(sin1, (m1 + m2) * g, out=u)
+    d_omega1 -= u
+    d_omega1 /= denom
+    d_omega1 /= l1
+    np.multiply(omega1, gamma, out=u)
+    d_omega1 -= u
+
+    d_omega2 = out[3]
+    np.multiply(w1_sq, sin_delta, out=d_omega2)
+    d_omega2 *= l1
+    np.multiply(sin2, g, out=u)
+    d_omega2 -= u
+    np.multiply(sin1, cos_delta, out=u)
+    u *= g
+    d_omega2 += u
+    d_omega2 *= m1 + m2
+    np.multiply(w2_sq, sin_delta, out=u)
+    u *= cos_delta
+    u *= m2 * l2
+    d_omega2 += u
+    d_omega2 /= denom
+    d_omega2 /= l2
+    np.multiply(omega2, gamma, out=u)
+    d_omega2 -= u
+
+    np.copyto(out[0], omega1)
+    np.copyto(out[2], omega2)
+    return out
+
+KERNELS = ("inplace", "legacy", "rk45") + SYMPLECTIC_METHODS
+PARAMETERS = ("m1", "m2", "l1", "l2", "g", "gamma")
+
 class OptimizedPendulumMatrix:
-    def __init__(self, N, M, theta1, theta2, omega1, omega2):
+    def __init__(self, N, M, theta1, theta2, omega1, omega2,
+                 m1=None, m2=None, l1=None, l2=None, g=None, gamma=0.0, kernel="inplace",
+                 rtol=1e-6, atol=1e-9, dtype=np.float64):
+        """
+        Vectorized grid of N x M independent double pendulums.
+
+        kernel="inplace" integrates with the instance parameters (damping included)
+        and reuses preallocated buffers, so a step makes no array allocation.
+        kernel="legacy" uses rk4_step and the module-level constants (other parameters raise ValueError).
+        kernel="rk45" advances each cell with its own adaptive Dormand-Prince step
+        size under the rtol/atol tolerances, so step(dt) can take a large dt.
+        kernel="midpoint" / "yoshida4" use the symplectic schemes of symplectic.py,
+        whose energy error stays bounded on long undamped runs with a larger dt.
+        Parameters left to None fall back to the module-level constants. Each
+        parameter may also be an array broadcastable to (N, M), to sweep it across
+        the grid (e.g. a mass ratio per row) within a single batched run.
+        dtype=np.float32 halves the memory traffic of every kernel, at the cost of
+        trajectories that leave the float64 ones sooner (see precision.py); with
+        rk45, keep rtol/atol above the float32 resolution (e.g. 1e-5 / 1e-6).
+        """
+        if kernel not in KERNELS:
+            raise ValueError(f"Unknown kernel '{kernel}', expected one of {KERNELS}.")
         self.N = N 
         self.M = M 
-        # shape = (N, M) for theta1, theta2, omega1, omega2 
+        self.kernel = kernel
+        self.m1 = m1 if m1 is not None else globals()["m1"]
+        self.m2 = m2 if m2 is not None else globals()["m2"]
+        self.l1 = l1 if l1 is not None else globals()["l1"]
+        self.l2 = l2 if l2 is not None else globals()["l2"]
+        self.g = g if g is not None else globals()["g"]
+        self.gamma = gamma
+        for name in PARAMETERS:
+            value = getattr(self, name)
+            if np.ndim(value) > 0:
+                value = np.asarray(value, dtype=dtype)
+                np.broadcast_to(value, (N, M))  # Raises if not broadcastable
+            else:
+                value = float(value)  # Python scalars keep float32 arithmetic in float32
+            setattr(self, name, value)
+        if kernel == "legacy":
+            # rk4_step integrates with the module-level constants and no damping
+            for name in PARAMETERS:
+                value = getattr(self, name)
+                if np.ndim(value) > 0 or value != globals().get(name, 0.0):
+                    raise ValueError(f"kernel='legacy' uses the module constants, it cannot integrate {name}={value}.")
+        self.rtol = rtol
+        self.atol = atol
+        self.step_count = 0
+        self._flat_parameters = {}  # name -> (parameter array, its flat (N * M,) version)
+
+        # State buffer (theta1, omega1, theta2, omega2), each of shape (N, M)
+        self.state = np.empty((4, N, M), dtype=dtype)
         self.theta1 = theta1
         self.theta2 = theta2
         self.omega1 = omega1
         self.omega2 = omega2
+        self._allocate_buffers()
+
+    # The four state arrays are views on self.state, assignment copies into the buffer
+    @property
+    def theta1(self):
+        return self.state[0]
+
+    @theta1.setter
+    def theta1(self, value):
+        self.state[0] = value
+
+    @property
+    def omega1(self):
+        return self.state[1]
+
+    @omega1.setter
+    def omega1(self, value):
+        self.state[1] = value
+
+    @property
+    def theta2(self):
+        return self.state[2]
+
+    @theta2.setter
+    def theta2(self, value):
+        self.state[2] = value
+
+    @property
+    def omega2(self):
+        return self.state[3]
+
+    @omega2.setter
+    def omega2(self, value):
+        self.state[3] = value
+
+    def _allocate_buffers(self):
+        shape, dtype = self.state.shape, self.state.dtype
+        self._k = np.empty(shape, dtype=dtype)      # current RK stage
+        self._acc = np.empty(shape, dtype=dtype)    # k1 + 2*k2 + 2*k3 + k4
+        self._y_tmp = np.empty(shape, dtype=dtype)  # intermediate state
+        # Per-cell scratch used by _derivatives_into
+        self._scratch = np.empty((9,) + shape[1:], dtype=dtype)
+        # Per-cell adaptive step sizes and derivative evaluation counts (rk45 kernel)
+        self.h = None
+        self.nfev = np.zeros(shape[1:], dtype=np.int64)
+
+    def _derivatives_into(self, Y, out):
+        return derivatives_into(Y, out, self._scratch,
+                                self.m1, self.m2, self.l1, self.l2, self.g, self.gamma)
+
+    def _rk4_step_inplace(self, dt):
+        Y, k, acc, y_tmp = self.state, self._k, self._acc, self._y_tmp
+
+        self._derivatives_into(Y, k)                # k1
+        np.copyto(acc, k)
+        np.multiply(k, 0.5 * dt, out=y_tmp)
+        y_tmp += Y
+
+        self._derivatives_into(y_tmp, k)            # k2
+        np.multiply(k, 2.0, out=y_tmp)
+        acc += y_tmp
+        np.multiply(k, 0.5 * dt, out=y_tmp)
+        y_tmp += Y
+
+        self._derivatives_into(y_tmp, k)            # k3
+        np.multiply(k, 2.0, out=y_tmp)
+        acc += y_tmp
+        np.multiply(k, dt, out=y_tmp)
+        y_tmp += Y
+
+        self._derivatives_into(y_tmp, k)            # k4
+        acc += k
+
+        acc *= dt / 6.0
+        Y += acc
+
+    def _rk45_step(self, dt):
+        Y = self.state.reshape(4, -1)  # View on contiguous grids, copy on row tiles
+        if self.h is None:
+            self.h = np.full(Y.shape[1], dt)
+        else:  # Cells allocated as NaN by tile() or a PendulumCell start from dt
+            np.copyto(self.h, dt, where=np.isnan(self.h))
+
+        def f(y, columns):
+            params = self._cell_parameters(columns)
+            return derivatives_into(y, np.empty_like(y), np.empty((9,) + y.shape[1:], dtype=y.dtype),
+                                    params["m1"], params["m2"], params["l1"], params["l2"],
+                                    params["g"], params["gamma"])
+
+        nfev = dopri45_advance(f, Y, dt, self.h, rtol=self.rtol, atol=self.atol)
+        if not np.shares_memory(Y, self.state):
+            self.state[...] = Y.reshape(self.state.shape)
+        self.nfev += nfev.reshape(self.nfev.shape)
+
+    def _flat_parameter(self, name):
+        """
+        Parameter array broadcast to the grid and flattened to (N * M,), built once per
+        array assigned to the parameter (a view when it already has the grid shape).
+        """
+        value = getattr(self, name)
+        cached = self._flat_parameters.get(name)
+        if cached is None or cached[0] is not value:
+            flat = np.ascontiguousarray(np.broadcast_to(value, self.state.shape[1:])).reshape(-1)
+            cached = self._flat_parameters[name] = (value, flat)
+        return cached[1]
+
+    def _cell_parameters(self, indices):
+        """Physical parameters of the given flat cells: scalars as they are, arrays as 1-D selections."""
+        params = {}
+        for name in PARAMETERS:
+            value = getattr(self, name)
+            params[name] = self._flat_parameter(name)[indices] if np.ndim(value) > 0 else value
+        return params
+
+    def take(self, indices):
+        """Returns an independent (n, 1) matrix holding copies of the given flat cell indices."""
+        state = self.state.reshape(4, -1)[:, indices]
+        n = state.shape[1]
+        params = {name: value[:, None] if np.ndim(value) > 0 else value
+                  for name, value in self._cell_parameters(indices).items()}
+        return OptimizedPendulumMatrix(n, 1, state[0, :, None], state[2, :, None],
+                                       state[1, :, None], state[3, :, None],
+                                       kernel=self.kernel, rtol=self.rtol, atol=self.atol,
+                                       dtype=self.state.dtype, **params)
+
+    def astype(self, dtype):
+        """Returns an independent copy of the matrix whose state is stored as dtype."""
+        params = {name: getattr(self, name) for name in PARAMETERS}
+        return OptimizedPendulumMatrix(self.N, self.M, self.theta1, self.theta2, self.omega1, self.omega2,
+                                       kernel=self.kernel, rtol=self.rtol, atol=self.atol,
+                                       dtype=dtype, **params)
+
+    def get_energy(self):
+        """Total energy of every cell, shape (N, M) (same formula as DoublePendulum.get_energy)."""
+        theta1, omega1, theta2, omega2 = self.state
+        m1, m2, l1, l2, g = self.m1, self.m2, self.l1, self.l2, self.g
+
+        ke_1 = 0.5 * m1 * (l1 * omega1)**2
+        ke_2 = 0.5 * m2 * ((l1 * omega1)**2 + (l2 * omega2)**2 +
+                           2 * l1 * l2 * omega1 * omega2 * np.cos(theta1 - theta2))
+        pe_1 = -m1 * g * l1 * np.cos(theta1)
+        pe_2 = -m2 * g * (l1 * np.cos(theta1) + l2 * np.cos(theta2))
+
+        return ke_1 + ke_2 + pe_1 + pe_2
+
+    def tile(self, start, stop):
+        """Returns a matrix over rows start:stop whose state, h and nfev are views on this one."""
+        sub = copy.copy(self)
+        sub.state = self.state[:, start:stop]
+        sub.N = sub.state.shape[1]
+        sub._flat_parameters = {}
+        for name in PARAMETERS:
+            value = getattr(self, name)
+            if np.ndim(value) > 0:
+                setattr(sub, name, np.broadcast_to(value, self.state.shape[1:])[start:stop])
+        sub._allocate_buffers()
+        # Adaptive step sizes and evaluation counts are views on this matrix's arrays
+        if self.h is None and self.kernel == "rk45":
+            self.h = np.full(self.N * self.M, np.nan)
+        if self.h is not None:
+            sub.h = self.h[start * self.M:stop * self.M]
+        sub.nfev = self.nfev[start:stop]
+        return sub
 
     def step(self, dt):
-        self.theta1, self.theta2, self.omega1, self.omega2 = rk4_step(
-            self.theta1, self.theta2, self.omega1, self.omega2, dt
-        )
-
-def optimized_different_angles(N, M):
-    angles1 = np.linspace(-np.pi, np.pi, N)
-    angles2 = np.linspace(-np.pi, np.pi, M)
-    theta1, theta2 = np.meshgrid(angles1, angles2)
-    omega1 = np.zeros((N, M))
-    omega2 = np.zeros((N, M))
-    return OptimizedPendulumMatrix(N, M, theta1, theta2, omega1, omega2)
-
-def optimized_different_speeds(N, M):
-    speeds1 = np.linspace(-6, 6, N)
-    speeds2 = np.linspace(-6, 6, N)
-    omega1, omega2 = np.meshgrid(speeds1, speeds2)
-    theta1 = np.zeros((N, M))
-    theta2 = np.zeros((N, M))
-    return OptimizedPendulumMatrix(N, M, theta1, theta2, omega1, omega2)
+        if self.kernel == "inplace":
+            self._rk4_step_inplace(dt)
+        elif self.kernel == "rk45":
+            self._rk45_step(dt)
+        elif self.kernel in SYMPLECTIC_METHODS:
+            self.state[...] = symplectic_step(self.state, dt, self.m1, self.m2, self.l1, self.l2,
+                                              self.g, self.gamma, method=self.kernel)
+        else:
+            self.theta1, self.theta2, self.omega1, self.omega2 = rk4_step(
+                self.theta1, self.theta2, self.omega1, self.omega2, dt
+            )
+        self.step_count += 1
+
+    def run(self, dt, n_steps, store=None):
+        """
+        Advances n_steps steps. With a TrajectoryStore, the current state is recorded first
+        if the store is empty, then every store.stride steps.
+        """
+        if store is not None and len(store) == 0:
+            store.append(self.state, self.step_count)
+        for _ in range(n_steps):
+            self.step(dt)
+            if store is not None and (self.step_count - store.first_step) % store.stride == 0:
+                store.append(self.state, self.step_count)
+
+STATE_VARIABLES = ("theta1", "omega1", "theta2", "omega2")
+
+def optimized_grid(N, M, x="theta1", y="theta2", x_range=(-np.pi, np.pi), y_range=(-np.pi, np.pi),
+                   theta1=0.0, omega1=0.0, theta2=0.0, omega2=0.0, **params):
+    """
+    Builds an N x M OptimizedPendulumMatrix sweeping two variables over arbitrary bounds.
+
+    x varies along the columns (M values spanning x_range) and y along the rows
+    (N values spanning y_range), bounds included. Each of x and y is a state variable
+    (theta1, omega1, theta2, omega2) or a physical parameter (m1, m2, l1, l2, g, gamma),
+    e.g. x="theta1", y="m2" sweeps initial angle against mass. The other state
+    variables take the given fixed values, and params (m1, m2, l1, l2, g, gamma,
+    kernel, dtype...) are passed to OptimizedPendulumMatrix. Narrow ranges zoom into a region.
+    """
+    allowed = STATE_VARIABLES + PARAMETERS
+    if x not in allowed or y not in allowed or x == y:
+        raise ValueError(f"x and y must be two different names among {allowed}.")
+    values = {"theta1": theta1, "omega1": omega1, "theta2": theta2, "omega2": omega2}
+    x_values, y_values = np.meshgrid(np.linspace(*x_range, M), np.linspace(*y_range, N))
+    for name, swept in ((x, x_values), (y, y_values)):
+        if name in STATE_VARIABLES:
+            values[name] = swept
+        else:
+            params[name] = swept
+    state = {name: np.broadcast_to(value, (N, M)) for name, value in values.items()}
+    return OptimizedPendulumMatrix(N, M, state["theta1"], state["theta2"], state["omega1"], state["omega2"], **params)
+
+def optimized_different_angles(N, M, **params):
+    return optimized_grid(N, M, "theta1", "theta2", (-np.pi, np.pi), (-np.pi, np.pi), **params)
+
+def optimized_different_speeds(N, M, **params):
+    return optimized_grid(N, M, "omega1", "omega2", (-6, 6), (-6, 6), **params)
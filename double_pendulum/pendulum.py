@@ -1,7 +1,80 @@
 import numpy as np
 from math import sin, cos, pi
 
+from dormand_prince import dopri45_advance
+from symplectic import SYMPLECTIC_METHODS, symplectic_step
+
+try:
+    from numba import njit
+except ImportError:  # Numba is optional, the pure-Python float path is used instead
+    njit = None
+
+
+# =================================================================================
+# Fused scalar kernels used by step_n (compiled with Numba when available)
+# =================================================================================
+
+def _simple_derivative(theta, omega, l, g, gamma):
+    return omega, -(g / l) * sin(theta) - gamma * omega
+
+def _simple_rk4_n(theta, omega, dt, k, l, g, gamma):
+    half_dt = 0.5 * dt
+    for _ in range(k):
+        k1_t, k1_w = _simple_derivative(theta, omega, l, g, gamma)
+        k2_t, k2_w = _simple_derivative(theta + half_dt * k1_t, omega + half_dt * k1_w, l, g, gamma)
+        k3_t, k3_w = _simple_derivative(theta + half_dt * k2_t, omega + half_dt * k2_w, l, g, gamma)
+        k4_t, k4_w = _simple_derivative(theta + dt * k3_t, omega + dt * k3_w, l, g, gamma)
+        theta += (dt / 6) * (k1_t + 2*k2_t + 2*k3_t + k4_t)
+        omega += (dt / 6) * (k1_w + 2*k2_w + 2*k3_w + k4_w)
+    return theta, omega
+
+def _double_derivative(theta1, omega1, theta2, omega2, m1, m2, l1, l2, g, gamma):
+    delta_theta = theta1 - theta2
+    sin_delta = sin(delta_theta)
+    cos_delta = cos(delta_theta)
+    denom = m1 + m2 * sin_delta**2
+
+    d_omega1_num = (m2 * g * sin(theta2) * cos_delta
+                    - m2 * sin_delta * (l1 * omega1**2 * cos_delta + l2 * omega2**2)
+                    - (m1 + m2) * g * sin(theta1))
+    d_omega1 = d_omega1_num / (l1 * denom) - gamma * omega1
+
+    d_omega2_num = ((m1 + m2) * (l1 * omega1**2 * sin_delta - g * sin(theta2) + g * sin(theta1) * cos_delta)
+                    + m2 * l2 * omega2**2 * sin_delta * cos_delta)
+    d_omega2 = d_omega2_num / (l2 * denom) - gamma * omega2
+
+    return omega1, d_omega1, omega2, d_omega2
+
+def _double_rk4_n(theta1, omega1, theta2, omega2, dt, k, m1, m2, l1, l2, g, gamma):
+    half_dt = 0.5 * dt
+    for _ in range(k):
+        a1, b1, c1, d1 = _double_derivative(theta1, omega1, theta2, omega2,
+                                            m1, m2, l1, l2, g, gamma)
+        a2, b2, c2, d2 = _double_derivative(theta1 + half_dt * a1, omega1 + half_dt * b1,
+                                            theta2 + half_dt * c1, omega2 + half_dt * d1,
+                                            m1, m2, l1, l2, g, gamma)
+        a3, b3, c3, d3 = _double_derivative(theta1 + half_dt * a2, omega1 + half_dt * b2,
+                                            theta2 + half_dt * c2, omega2 + half_dt * d2,
+                                            m1, m2, l1, l2, g, gamma)
+        a4, b4, c4, d4 = _double_derivative(theta1 + dt * a3, omega1 + dt * b3,
+                                            theta2 + dt * c3, omega2 + dt * d3,
+                                            m1, m2, l1, l2, g, gamma)
+        theta1 += (dt / 6) * (a1 + 2*a2 + 2*a3 + a4)
+        omega1 += (dt / 6) * (b1 + 2*b2 + 2*b3 + b4)
+        theta2 += (dt / 6) * (c1 + 2*c2 + 2*c3 + c4)
+        omega2 += (dt / 6) * (d1 + 2*d2 + 2*d3 + d4)
+    return theta1, omega1, theta2, omega2
+
+if njit is not None:
+    _simple_derivative = njit(cache=True)(_simple_derivative)
+    _simple_rk4_n = njit(cache=True, nogil=True)(_simple_rk4_n)  # Lets the GUI run during physics
+    _double_derivative = njit(cache=True)(_double_derivative)
+    _double_rk4_n = njit(cache=True, nogil=True)(_double_rk4_n)
+
+
 class Pendulum():
+    INTEGRATORS = ("rk4", "rk45")
+
     def __init__(self, g, gamma, color=None):
         self.g = g
         self.gamma = gamma
@@ -9,8 +82,15 @@ class Pendulum():
         self.Y = np.array([])
         self.Y0 = np.array([])
         self.color = color
+        self.integrator = "rk4"
+        self.rtol = 1e-6
+        self.atol = 1e-9
+        self.h = None  # Adaptive step size guess (rk45 integrator)
     
     def step(self, dt):
+        if self.integrator == "rk45":
+            self._step_rk45(dt)
+            return
         y_old = self.Y
 
         k1 = self.derivative(y_old)
@@ -19,6 +99,21 @@ class Pendulum():
         k4 = self.derivative(y_old + dt * k3)
         self.Y += (dt/6) * (k1 + 2*k2 + 2*k3 + k4)
         self.time_elapsed += dt       
+
+    def _step_rk45(self, dt):
+        """Advances by dt with adaptive Dormand-Prince substeps."""
+        if self.h is None:
+            self.h = np.array([dt])
+        Y = self.Y.reshape(-1, 1)
+        dopri45_advance(lambda y, _: self.derivative(y[:, 0]).reshape(-1, 1), Y, dt, self.h,
+                        rtol=self.rtol, atol=self.atol)
+        self.Y = Y[:, 0]
+        self.time_elapsed += dt
+
+    def step_n(self, dt, k):
+        """Advances the simulation by k steps of size dt."""
+        for _ in range(k):
+            self.step(dt)
     
     def reset(self):
         self.Y = self.Y0.copy()
@@ -32,6 +127,17 @@ class Pendulum():
     
     def set_gamma(self, gamma):
         self.gamma = float(gamma)
+
+    def set_integrator(self, integrator, rtol=None, atol=None):
+        """Selects one of INTEGRATORS, e.g. "rk4" (fixed step) or "rk45" (adaptive, error controlled by rtol/atol)."""
+        if integrator not in self.INTEGRATORS:
+            raise ValueError(f"Unknown integrator '{integrator}', expected one of {self.INTEGRATORS}.")
+        self.integrator = integrator
+        if rtol is not None:
+            self.rtol = float(rtol)
+        if atol is not None:
+            self.atol = float(atol)
+        self.h = None
         
     def derivative(self, Y):
         pass 
@@ -56,6 +162,14 @@ class SimplePendulum(Pendulum):
         d_theta = omega
         d_omega = - (self.g / self.l) * np.sin(theta) - self.gamma * omega
         return np.array([d_theta, d_omega])
+
+    def step_n(self, dt, k):
+        if self.integrator != "rk4":
+            return super().step_n(dt, k)
+        theta, omega = self.Y
+        self.Y[:] = _simple_rk4_n(float(theta), float(omega), float(dt), int(k),
+                                  float(self.l), float(self.g), float(self.gamma))
+        self.time_elapsed += k * dt
     
     def get_cartesian_coords(self):
         theta, _ = self.Y
@@ -77,6 +191,9 @@ class SimplePendulum(Pendulum):
         self.m = float(m)
         
 class DoublePendulum(Pendulum):
+    # "midpoint" and "yoshida4" are symplectic: bounded energy error on long undamped runs
+    INTEGRATORS = Pendulum.INTEGRATORS + SYMPLECTIC_METHODS
+
     def __init__(self, l1=1.0, m1=1.0, l2=1.0, m2=1.0, g=9.81, 
                  theta1_deg=120.0, omega1=0.0, 
                  theta2_deg=120.0, omega2=0.0,
@@ -114,6 +231,24 @@ class DoublePendulum(Pendulum):
         d_omega2 -= self.gamma * omega2 
     
         return np.array([omega1, d_omega1, omega2, d_omega2])
+
+    def step(self, dt):
+        if self.integrator in SYMPLECTIC_METHODS:
+            self.Y = symplectic_step(self.Y, dt, self.m1, self.m2, self.l1, self.l2,
+                                     self.g, self.gamma, method=self.integrator)
+            self.time_elapsed += dt
+        else:
+            super().step(dt)
+
+    def step_n(self, dt, k):
+        if self.integrator != "rk4":
+            return super().step_n(dt, k)
+        theta1, omega1, theta2, omega2 = self.Y
+        self.Y[:] = _double_rk4_n(float(theta1), float(omega1), float(theta2), float(omega2),
+                                  float(dt), int(k),
+                                  float(self.m1), float(self.m2), float(self.l1), float(self.l2),
+                                  float(self.g), float(self.gamma))
+        self.time_elapsed += k * dt
     
     def get_cartesian_coords(self):
         theta1, _, theta2, _ = self.Y
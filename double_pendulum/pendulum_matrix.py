@@ -3,6 +3,7 @@ import numpy as np
 import colormap2d 
 
 from pendulum import DoublePendulum 
+from optimized_pendulum_matrix import OptimizedPendulumMatrix, PARAMETERS
 
 def theta_to_index(theta, N):
     """Convertit un angle en indice de matrice."""
@@ -14,55 +15,250 @@ def index_to_theta(index, N):
     theta = index * 2 * np.pi / N
     return theta
 
-def compute_colormap(N, M):
-    grid = np.array([
-        [[x/N, y/N] for y in range(M)] for x in range(N) 
-    ])
+def compute_colormap(N, M, name="cyclic_pinwheel"):
+    """Couleur RGBA (float) de chaque case (x/N, y/M) pour la colormap 2D `name` de colormap2d."""
+    x, y = np.meshgrid(np.arange(N) / N, np.arange(M) / M, indexing="ij")
+    grid = np.stack([x, y], axis=-1)
 
-    return colormap2d.cyclic_pinwheel(grid)
+    return getattr(colormap2d, name)(grid)
 
-def matrix_generator(N, M, l1=1.0, m1=1.0, l2=1.0, m2=1.0, g=9.81):
+def _cell_parameter(name):
+    """
+    Physical parameter stored on the grid, as a scalar shared by every cell or an (N, M) array.
+    Setting a value that differs from a shared scalar turns it into an array, so only this cell changes.
+    """
+    def getter(self):
+        value = getattr(self._grid, name)
+        return float(value[self._i, self._j]) if np.ndim(value) > 0 else value
+
+    def setter(self, value):
+        values = getattr(self._grid, name)
+        if np.ndim(values) == 0 and values == value:
+            return
+        values = np.array(np.broadcast_to(values, (self._grid.N, self._grid.M)))
+        values[self._i, self._j] = value
+        setattr(self._grid, name, values)
+
+    return property(getter, setter)
+
+class PendulumCell(DoublePendulum):
+    """
+    Lightweight proxy on the cell (i, j) of a PendulumGrid, usable like a DoublePendulum.
+    Its state, physical parameters and time are read from the grid arrays, so stepping
+    or resetting a cell leaves the others untouched. The integrator (and rtol/atol) is
+    that of the whole grid and is chosen with PendulumGrid.set_integrator().
+    """
+    def __init__(self, grid, i, j):
+        self._grid = grid
+        self._i = i
+        self._j = j
+
+    @property
+    def Y(self):
+        return self._grid.engine.state[:, self._i, self._j]
+
+    @Y.setter
+    def Y(self, value):
+        self._grid.engine.state[:, self._i, self._j] = value
+
+    @property
+    def Y0(self):
+        return self._grid.initial_state[:, self._i, self._j]
+
+    @Y0.setter
+    def Y0(self, value):
+        self._grid.initial_state[:, self._i, self._j] = value
+
+    @property
+    def color(self):
+        return self._grid.colors[self._i, self._j].copy()
+
+    @color.setter
+    def color(self, value):
+        self._grid.colors[self._i, self._j] = value
+
+    @property
+    def time_elapsed(self):
+        return self._grid.time_elapsed + self._grid.time_offsets[self._i, self._j]
+
+    @time_elapsed.setter
+    def time_elapsed(self, value):
+        self._grid.time_offsets[self._i, self._j] = value - self._grid.time_elapsed
+
+    @property
+    def integrator(self):
+        return self._grid.integrator
+
+    @property
+    def rtol(self):
+        return self._grid.engine.rtol
+
+    @property
+    def atol(self):
+        return self._grid.engine.atol
+
+    @property
+    def h(self):
+        """Adaptive step size of the cell, a view on the grid's (None before the first rk45 step)."""
+        engine = self._grid.engine
+        if engine.h is None:
+            return None
+        index = self._i * self._grid.M + self._j
+        return engine.h[index:index + 1]
+
+    @h.setter
+    def h(self, value):
+        engine = self._grid.engine
+        if engine.h is None:
+            engine.h = np.full(self._grid.N * self._grid.M, np.nan)  # Unset cells start from dt
+        engine.h[self._i * self._grid.M + self._j] = np.nan if value is None else np.ravel(value)[0]
+
+    def set_integrator(self, integrator, rtol=None, atol=None):
+        raise ValueError("The integrator is shared by every cell of a grid, use PendulumGrid.set_integrator().")
+
+    l1 = _cell_parameter("l1")
+    m1 = _cell_parameter("m1")
+    l2 = _cell_parameter("l2")
+    m2 = _cell_parameter("m2")
+    g = _cell_parameter("g")
+    gamma = _cell_parameter("gamma")
+
+class _GridRow:
+    def __init__(self, grid, i):
+        self._grid = grid
+        self._i = i
+
+    def __len__(self):
+        return self._grid.M
+
+    def __getitem__(self, j):
+        if not -self._grid.M <= j < self._grid.M:
+            raise IndexError("column index out of range")
+        return PendulumCell(self._grid, self._i, j % self._grid.M)
+
+    def __iter__(self):
+        return (self[j] for j in range(len(self)))
+
+class PendulumGrid:
+    """
+    Struct-of-arrays storage for an N x M matrix of double pendulums.
+
+    The states live in an OptimizedPendulumMatrix (engine) and the colors in an (N, M, 4)
+    array; grid[i][j] returns a PendulumCell proxy, so code written for the former
+    list of lists of DoublePendulum keeps working. Physical parameters are scalars
+    shared by every cell or (N, M) arrays with one value per cell.
+    """
+    def __init__(self, state, colors, l1=1.0, m1=1.0, l2=1.0, m2=1.0, g=9.81, gamma=0.0, dtype=np.float64):
+        _, self.N, self.M = state.shape
+        self.engine = OptimizedPendulumMatrix(self.N, self.M, state[0], state[2], state[1], state[3],
+                                              m1=m1, m2=m2, l1=l1, l2=l2, g=g, gamma=gamma, dtype=dtype)
+        self.initial_state = np.array(state, dtype=float)
+        self.colors = np.array(colors, dtype=float)
+        self.time_elapsed = 0.0
+        # Time of each cell relative to time_elapsed, changed when a cell is stepped or reset on its own
+        self.time_offsets = np.zeros((self.N, self.M))
+
+    @classmethod
+    def from_pendulums(cls, matrix):
+        """
+        Builds a grid from a list of lists of DoublePendulum, copying their states.
+        Parameters that differ between pendulums become (N, M) arrays.
+        """
+        state = np.array([[pendulum.Y for pendulum in row] for row in matrix]).transpose(2, 0, 1)
+        colors = np.array([[pendulum.color for pendulum in row] for row in matrix])
+        params = {}
+        for name in PARAMETERS:
+            values = np.array([[getattr(pendulum, name) for pendulum in row] for row in matrix], dtype=float)
+            params[name] = float(values[0, 0]) if np.all(values == values[0, 0]) else values
+        grid = cls(state, colors, **params)
+        grid.time_offsets[...] = [[pendulum.time_elapsed for pendulum in row] for row in matrix]
+        return grid
+
+    def write_back(self, matrix):
+        """Copies the states and times of the grid into a list of lists of DoublePendulum."""
+        for i, row in enumerate(matrix):
+            for j, pendulum in enumerate(row):
+                pendulum.Y = self.engine.state[:, i, j].astype(float)
+                pendulum.time_elapsed = self.time_elapsed + self.time_offsets[i, j]
+
+    @property
+    def integrator(self):
+        """Integrator of every cell, named as in DoublePendulum.INTEGRATORS."""
+        return "rk4" if self.engine.kernel in ("inplace", "legacy") else self.engine.kernel
+
+    def set_integrator(self, integrator, rtol=None, atol=None):
+        """Selects the integrator of every cell (see DoublePendulum.set_integrator)."""
+        if integrator not in DoublePendulum.INTEGRATORS:
+            raise ValueError(f"Unknown integrator '{integrator}', expected one of {DoublePendulum.INTEGRATORS}.")
+        self.engine.kernel = "inplace" if integrator == "rk4" else integrator
+        if rtol is not None:
+            self.engine.rtol = float(rtol)
+        if atol is not None:
+            self.engine.atol = float(atol)
+        self.engine.h = None
+
+    # Physical parameters are those of the vectorized engine
+    l1 = property(lambda self: self.engine.l1, lambda self, value: setattr(self.engine, "l1", value))
+    m1 = property(lambda self: self.engine.m1, lambda self, value: setattr(self.engine, "m1", value))
+    l2 = property(lambda self: self.engine.l2, lambda self, value: setattr(self.engine, "l2", value))
+    m2 = property(lambda self: self.engine.m2, lambda self, value: setattr(self.engine, "m2", value))
+    g = property(lambda self: self.engine.g, lambda self, value: setattr(self.engine, "g", value))
+    gamma = property(lambda self: self.engine.gamma, lambda self, value: setattr(self.engine, "gamma", value))
+
+    def __len__(self):
+        return self.N
+
+    def __getitem__(self, i):
+        if not -self.N <= i < self.N:
+            raise IndexError("row index out of range")
+        return _GridRow(self, i % self.N)
+
+    def __iter__(self):
+        return (self[i] for i in range(self.N))
+
+def matrix_generator(N, M, l1=1.0, m1=1.0, l2=1.0, m2=1.0, g=9.81, dtype=np.float64):
     colormap = compute_colormap(N, M)
-    matrix = [] 
-
-    for i in range(N):
-        matrix.append([]) 
-        theta1 = index_to_theta(i, N) - np.pi 
-        for j in range(M):
-            theta2 = index_to_theta(j, M) - np.pi 
-            color = colormap[i, j] 
-            pendulum = DoublePendulum(l1=l1, m1=m1, l2=l2, m2=m2, g=g, 
-                theta1_deg=np.rad2deg(theta1), omega1=0.0, 
-                theta2_deg=np.rad2deg(theta2), omega2=0.0, 
-                gamma=0.0, color=color) 
-            matrix[i].append(pendulum) 
-
-    return matrix
+
+    theta1 = index_to_theta(np.arange(N), N) - np.pi
+    theta2 = index_to_theta(np.arange(M), M) - np.pi
+    state = np.zeros((4, N, M))
+    state[0] = theta1[:, None]
+    state[2] = theta2[None, :]
+
+    return PendulumGrid(state, colormap, l1=l1, m1=m1, l2=l2, m2=m2, g=g, gamma=0.0, dtype=dtype)
 
 class DoublePendulumMatrix: 
     def __init__(self, matrix):
-        self.N = len(matrix)      # Number of rows 
-        self.M = len(matrix[0])   # Number of columns 
+        """
+        matrix is a PendulumGrid (from matrix_generator) or a list of lists of DoublePendulum.
+        A list is copied into a PendulumGrid: stepping leaves the DoublePendulum objects
+        untouched until write_back() copies the current states into them.
+        """
+        self.pendulums = None
+        if not isinstance(matrix, PendulumGrid):
+            self.pendulums = matrix
+            matrix = PendulumGrid.from_pendulums(matrix)
+        self.N = matrix.N         # Number of rows 
+        self.M = matrix.M         # Number of columns 
         self.matrix = matrix 
         self.colormap = compute_colormap(self.N, self.M) 
 
     def step(self, dt):
-        for i in range(self.N):
-            for j in range(self.M): 
-                self.matrix[i][j].step(dt) 
+        self.matrix.engine.step(dt)
+        self.matrix.time_elapsed += dt
+
+    def write_back(self):
+        """Copies the current states and time into the DoublePendulum objects given to __init__."""
+        if self.pendulums is not None:
+            self.matrix.write_back(self.pendulums)
 
     def update_color(self):
-        for i in range(self.N):
-            for j in range(self.N):
-                pendulum = self.matrix[i][j]
-                theta1, _, theta2, _ = pendulum.Y 
-                i_new = theta_to_index(theta1, self.N)
-                j_new = theta_to_index(theta2, self.M)
-                pendulum.color = self.colormap[i_new, j_new]
+        theta1 = self.matrix.engine.theta1
+        theta2 = self.matrix.engine.theta2
+        # Same mapping as theta_to_index, for every cell at once
+        i_new = np.floor(theta1 * self.N / (2 * np.pi)).astype(int) % self.N
+        j_new = np.floor(theta2 * self.M / (2 * np.pi)).astype(int) % self.M
+        self.matrix.colors = self.colormap[i_new, j_new]
 
     def get_image(self):
-        colors = np.zeros((self.N, self.M, 4))
-        for i in range(self.N):
-            for j in range(self.M):
-                colors[i, j] = self.matrix[i][j].color
-        return colors 
+        return self.matrix.colors.copy()
@@ -0,0 +1,88 @@
+import threading
+import time
+from collections import deque, namedtuple
+
+from instrumentation import instrumentation
+
+# Everything the GUI draws or records for one instant of the simulation
+Snapshot = namedtuple("Snapshot", ["time", "x1", "y1", "x2", "y2", "theta2", "omega2", "energy"])
+
+
+def take_snapshot(sim):
+    (x1, y1), (x2, y2) = sim.get_cartesian_coords()
+    return Snapshot(sim.time_elapsed, x1, y1, x2, y2, sim.Y[2], sim.Y[3], sim.get_energy())
+
+
+class PhysicsWorker:
+    """
+    Advances a DoublePendulum in a background thread at the wall-clock rate.
+
+    Every steps_per_snapshot steps of dt, a Snapshot is appended to a bounded deque
+    (appends and pops are atomic, no lock is needed for the handoff); drain() hands the
+    pending snapshots to the GUI, which draws the latest one at its own rate. Under load
+    the oldest snapshots are discarded, never the simulated time. Code changing the
+    pendulum from another thread (parameters, reset) must hold `lock`; snapshots are
+    queued under it too, so a drain() under the lock leaves no stale snapshot behind.
+    """
+
+    def __init__(self, sim, dt, steps_per_snapshot, max_pending=256, max_lag=0.25):
+        self.sim = sim
+        self.dt = dt
+        self.steps_per_snapshot = steps_per_snapshot
+        self.max_lag = max_lag  # Seconds behind wall time after which the worker stops catching up
+        self.lock = threading.RLock()
+        self.snapshots = deque(maxlen=max_pending)
+        self._running = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="physics", daemon=True)
+
+    def start(self):
+        self._running.set()
+        self._thread.start()
+
+    def pause(self):
+        """Stops the simulation; once this returns, the pendulum is not stepped again until resume()."""
+        with self.lock:
+            self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    def stop(self):
+        self._stopped.set()
+        self._running.set()  # Wakes a paused worker so it can exit
+        self._thread.join()
+
+    def drain(self):
+        """Pending snapshots, oldest first."""
+        snapshots = []
+        while self.snapshots:
+            snapshots.append(self.snapshots.popleft())
+        return snapshots
+
+    def _run(self):
+        period = self.dt * self.steps_per_snapshot
+        deadline = None
+        while not self._stopped.is_set():
+            if not self._running.is_set():
+                self._running.wait()
+                deadline = None  # Paused time is not simulated afterwards
+                continue
+            if deadline is None:
+                deadline = time.perf_counter()
+
+            with self.lock:
+                if not self._running.is_set():
+                    continue  # Paused while waiting for the lock
+                with instrumentation.stage("physics"):
+                    self.sim.step_n(self.dt, self.steps_per_snapshot)
+                self.snapshots.append(take_snapshot(self.sim))
+            instrumentation.count("steps", self.steps_per_snapshot)
+            instrumentation.count("cell_steps", self.steps_per_snapshot)
+
+            deadline += period
+            delay = deadline - time.perf_counter()
+            if delay > 0:
+                self._stopped.wait(delay)
+            elif delay < -self.max_lag:
+                deadline = time.perf_counter()  # Too slow for real time: run behind instead of spiralling
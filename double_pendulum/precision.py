@@ -0,0 +1,74 @@
+import time
+import numpy as np
+
+from optimized_pendulum_matrix import optimized_different_angles
+from colormap_lut import AngleColorizer
+from progressive import angle_distance
+
+
+def divergence_time(pendulums, dt=1e-3, T=10.0, threshold=0.1, dtype=np.float32):
+    """
+    Time at which each cell of an OptimizedPendulumMatrix integrated in `dtype` leaves
+    its float64 trajectory, i.e. one of its angles differs by more than `threshold` radians.
+
+    Both runs start from the same (rounded) initial state and use the matrix's kernel and
+    parameters; `pendulums` itself is left untouched. Returns an (N, M) array in seconds,
+    np.inf for the cells that stayed within threshold up to T.
+    """
+    reference = pendulums.astype(np.float64)
+    reduced = pendulums.astype(dtype)
+    reference.state[...] = reduced.state  # Same starting point, only the arithmetic differs
+
+    n_steps = int(T / dt)
+    diverged_at = np.full(reference.state.shape[1:], np.inf)
+    for step in range(1, n_steps + 1):
+        reference.step(dt)
+        reduced.step(dt)
+        gap = np.maximum(angle_distance(reference.theta1, reduced.theta1),
+                         angle_distance(reference.theta2, reduced.theta2))
+        diverged_at[(gap > threshold) & np.isinf(diverged_at)] = step * dt
+    return diverged_at
+
+
+def benchmark_precisions(N=100, M=100, dt=1e-3, T=10.0, threshold=0.1, kernel="inplace", timing_steps=200):
+    """
+    Compares float32 and float64 on the optimized_different_angles(N, M) chaos map.
+
+    Returns a dict with the mean step time of each precision, the float32 speedup, the
+    fraction of cells that diverged before T with their median divergence time, and the
+    fraction of pixels of the final image whose colour differs between the two precisions.
+    """
+    results = {"N": N, "M": M, "dt": dt, "T": T, "threshold": threshold, "kernel": kernel}
+    for dtype in (np.float64, np.float32):
+        pendulums = optimized_different_angles(N, M, kernel=kernel, dtype=dtype)
+        pendulums.step(dt)  # Warm-up
+        start = time.perf_counter()
+        for _ in range(timing_steps):
+            pendulums.step(dt)
+        results[f"step_time_{np.dtype(dtype).name}"] = (time.perf_counter() - start) / timing_steps
+    results["speedup"] = results["step_time_float64"] / results["step_time_float32"]
+
+    pendulums = optimized_different_angles(N, M, kernel=kernel)
+    diverged_at = divergence_time(pendulums, dt=dt, T=T, threshold=threshold)
+    diverged = np.isfinite(diverged_at)
+    results["diverged_fraction"] = float(diverged.mean())
+    results["median_divergence_time"] = float(np.median(diverged_at[diverged])) if diverged.any() else None
+
+    colorizer = AngleColorizer(N, M)
+    images = []
+    for dtype in (np.float64, np.float32):
+        final = pendulums.astype(dtype)
+        for _ in range(int(T / dt)):
+            final.step(dt)
+        images.append(colorizer(final.theta1, final.theta2).copy())
+    results["pixel_mismatch"] = float(np.any(images[0] != images[1], axis=-1).mean())
+    return results
+
+
+if __name__ == "__main__":
+    for T in (1.0, 5.0, 10.0, 20.0):
+        results = benchmark_precisions(N=100, M=100, T=T)
+        print(f"T={T:5.1f} s  speedup x{results['speedup']:.2f}  "
+              f"diverged {100 * results['diverged_fraction']:5.1f}%  "
+              f"median divergence {results['median_divergence_time']} s  "
+              f"pixels changed {100 * results['pixel_mismatch']:5.1f}%")
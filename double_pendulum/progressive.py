@@ -0,0 +1,90 @@
+import numpy as np
+
+from optimized_pendulum_matrix import optimized_grid
+from colormap_lut import AngleColorizer
+
+
+def angle_distance(a, b):
+    """Distance between two angles on the circle, in [0, π]."""
+    return np.abs((a - b + np.pi) % (2 * np.pi) - np.pi)
+
+
+def _block_any(mask, size):
+    """For each size x size block of mask (last blocks may be smaller), whether any entry is set."""
+    rows = np.arange(0, mask.shape[0], size)
+    cols = np.arange(0, mask.shape[1], size)
+    return np.logical_or.reduceat(np.logical_or.reduceat(mask, rows, axis=0), cols, axis=1)
+
+
+def progressive_angle_map(N, M, dt=1e-3, T=10.0, coarse_step=16, threshold=0.5, **grid_kwargs):
+    """
+    Progressive (quadtree) rendering of the chaos map of optimized_different_angles(N, M),
+    or of any region built by optimized_grid(N, M, **grid_kwargs).
+
+    The map is first computed on a coarse grid (one cell out of coarse_step in each
+    direction), each result painting its whole block. Blocks touching a neighbour whose
+    final angles differ by more than `threshold` radians are split in four and only the
+    new block origins are simulated, down to single cells. Smooth basins are never refined.
+
+    Generator yielding (step, image, n_computed) after each level: the current block size,
+    an (N, M, 4) uint8 image and the number of cells simulated so far.
+    """
+    if coarse_step < 1 or coarse_step & (coarse_step - 1):
+        raise ValueError("coarse_step must be a power of two.")
+
+    initial = optimized_grid(N, M, **grid_kwargs)
+    n_steps = int(T / dt)
+    colorizer = AngleColorizer(N, M)
+
+    final_theta1 = np.zeros((N, M))
+    final_theta2 = np.zeros((N, M))
+    computed = np.zeros((N, M), dtype=bool)
+    # Painted field: every pixel holds the final angles of its current block origin
+    field_theta1 = np.zeros((N, M))
+    field_theta2 = np.zeros((N, M))
+
+    rows, cols = np.indices((N, M))
+    step = coarse_step
+    active = np.ones((-(-N // step), -(-M // step)), dtype=bool)
+
+    while True:
+        # Simulate the origins of the active blocks that are not known yet
+        block_rows, block_cols = np.nonzero(active)
+        origins = np.ravel_multi_index((block_rows * step, block_cols * step), (N, M))
+        origins = origins[~computed.reshape(-1)[origins]]
+        if origins.size:
+            batch = initial.take(origins)
+            for _ in range(n_steps):
+                batch.step(dt)
+            final_theta1.reshape(-1)[origins] = batch.theta1[:, 0]
+            final_theta2.reshape(-1)[origins] = batch.theta2[:, 0]
+            computed.reshape(-1)[origins] = True
+
+        # Paint the active blocks with their origin's result
+        painted = active[rows // step, cols // step]
+        origin_rows = (rows // step) * step
+        origin_cols = (cols // step) * step
+        field_theta1[painted] = final_theta1[origin_rows[painted], origin_cols[painted]]
+        field_theta2[painted] = final_theta2[origin_rows[painted], origin_cols[painted]]
+
+        image = colorizer(field_theta1, field_theta2).copy()
+        yield step, image, int(computed.sum())
+
+        if step == 1:
+            return
+
+        # Mark both sides of every boundary where neighbouring results diverge
+        divergent = np.zeros((N, M), dtype=bool)
+        for axis in (0, 1):
+            jump = np.maximum(angle_distance(np.diff(field_theta1, axis=axis), 0),
+                              angle_distance(np.diff(field_theta2, axis=axis), 0)) > threshold
+            if axis == 0:
+                divergent[1:] |= jump
+                divergent[:-1] |= jump
+            else:
+                divergent[:, 1:] |= jump
+                divergent[:, :-1] |= jump
+
+        refine = _block_any(divergent, step)
+        step //= 2
+        active = np.repeat(np.repeat(refine, 2, axis=0), 2, axis=1)[:-(-N // step), :-(-M // step)]
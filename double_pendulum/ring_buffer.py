@@ -0,0 +1,56 @@
+import numpy as np
+
+
+class RingBuffer:
+    """
+    Sliding window over the last maxlen fixed-width rows (e.g. (x, y) points), kept in a NumPy array.
+
+    values() is a contiguous (n, width) view of the rows, oldest first, made without
+    copying. append() is O(1) amortized: rows are written after the last one, and when
+    the end of the storage is reached the live rows are moved back to its start (or the
+    storage doubles if it is more than half full). Beyond maxlen rows the oldest ones are
+    dropped, so memory and per-frame cost stay bounded. With maxlen=None nothing is
+    dropped and the buffer grows like a list: give a maxlen to long-running histories.
+    """
+
+    def __init__(self, width, maxlen=None, capacity=1024):
+        self.width = width
+        self.maxlen = maxlen
+        size = 2 * maxlen if maxlen is not None else capacity
+        self._data = np.empty((max(size, 2), width))
+        self._start = 0
+        self._end = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    def append(self, row):
+        if self._end == len(self._data):
+            self._make_room()
+        self._data[self._end] = row
+        self._end += 1
+        if self.maxlen is not None and len(self) > self.maxlen:
+            self._start = self._end - self.maxlen
+
+    def _make_room(self):
+        n = len(self)
+        if n <= len(self._data) // 2:
+            self._data[:n] = self._data[self._start:self._end]
+        else:
+            data = np.empty((2 * len(self._data), self.width))
+            data[:n] = self._data[self._start:self._end]
+            self._data = data
+        self._start, self._end = 0, n
+
+    def clear(self):
+        self._start = self._end = 0
+
+    def values(self):
+        """Contiguous view of the rows (valid until the next append)."""
+        return self._data[self._start:self._end]
+
+    def __getitem__(self, index):
+        return self.values()[index]
+
+    def __array__(self, dtype=None, copy=None):
+        return np.array(self.values(), dtype=dtype)
@@ -0,0 +1,85 @@
+import numpy as np
+
+# Triple-jump coefficients turning a symmetric 2nd order step into a 4th order one (Yoshida)
+YOSHIDA_W1 = 1.0 / (2.0 - 2.0**(1/3))
+YOSHIDA_W0 = -2.0**(1/3) / (2.0 - 2.0**(1/3))
+
+SYMPLECTIC_METHODS = ("midpoint", "yoshida4")
+
+
+def to_canonical(Y, m1, m2, l1, l2):
+    """(theta1, omega1, theta2, omega2) -> (theta1, p1, theta2, p2), along the first axis."""
+    theta1, omega1, theta2, omega2 = Y
+    cos_delta = np.cos(theta1 - theta2)
+    p1 = (m1 + m2) * l1**2 * omega1 + m2 * l1 * l2 * omega2 * cos_delta
+    p2 = m2 * l2**2 * omega2 + m2 * l1 * l2 * omega1 * cos_delta
+    return np.array([theta1, p1, theta2, p2])
+
+
+def from_canonical(Z, m1, m2, l1, l2):
+    """(theta1, p1, theta2, p2) -> (theta1, omega1, theta2, omega2), along the first axis."""
+    theta1, p1, theta2, p2 = Z
+    delta = theta1 - theta2
+    cos_delta = np.cos(delta)
+    denom = m1 + m2 * np.sin(delta)**2
+    omega1 = (l2 * p1 - l1 * p2 * cos_delta) / (l1**2 * l2 * denom)
+    omega2 = (l1 * (m1 + m2) * p2 - l2 * m2 * p1 * cos_delta) / (l1 * l2**2 * m2 * denom)
+    return np.array([theta1, omega1, theta2, omega2])
+
+
+def hamiltonian_derivatives(Z, m1, m2, l1, l2, g, gamma):
+    """Hamilton's equations of the double pendulum; damping acts as dp/dt -= gamma * p."""
+    theta1, p1, theta2, p2 = Z
+    delta = theta1 - theta2
+    sin_delta = np.sin(delta)
+    cos_delta = np.cos(delta)
+    denom = m1 + m2 * sin_delta**2
+
+    d_theta1 = (l2 * p1 - l1 * p2 * cos_delta) / (l1**2 * l2 * denom)
+    d_theta2 = (l1 * (m1 + m2) * p2 - l2 * m2 * p1 * cos_delta) / (l1 * l2**2 * m2 * denom)
+
+    c1 = p1 * p2 * sin_delta / (l1 * l2 * denom)
+    c2 = ((l2**2 * m2 * p1**2 + l1**2 * (m1 + m2) * p2**2 - 2 * l1 * l2 * m2 * p1 * p2 * cos_delta)
+          * sin_delta * cos_delta / (l1**2 * l2**2 * denom**2))
+
+    d_p1 = -(m1 + m2) * g * l1 * np.sin(theta1) - c1 + c2 - gamma * p1
+    d_p2 = -m2 * g * l2 * np.sin(theta2) + c1 - c2 - gamma * p2
+
+    return np.array([d_theta1, d_p1, d_theta2, d_p2])
+
+
+def implicit_midpoint_step(Z, h, params, tol=1e-13, max_iter=100):
+    """
+    One implicit midpoint step z_new = z + h * f((z + z_new) / 2), solved by fixed-point
+    iteration on the midpoint. Symplectic and time-symmetric (2nd order).
+    tol is raised to the resolution of Z's dtype, so float32 states converge too.
+    """
+    tol = max(tol, 4 * np.finfo(np.result_type(Z, np.float32)).eps)
+    z_mid = Z + 0.5 * h * hamiltonian_derivatives(Z, *params)
+    for _ in range(max_iter):
+        z_next = Z + 0.5 * h * hamiltonian_derivatives(z_mid, *params)
+        converged = np.max(np.abs(z_next - z_mid)) <= tol * (1.0 + np.max(np.abs(z_next)))
+        z_mid = z_next
+        if converged:
+            break
+    else:
+        raise RuntimeError("Implicit midpoint iteration did not converge, reduce the time step.")
+    return 2.0 * z_mid - Z
+
+
+def symplectic_step(Y, dt, m1, m2, l1, l2, g, gamma, method="midpoint"):
+    """
+    Advances a (theta1, omega1, theta2, omega2) state (scalars or arrays on the first axis)
+    by dt with a symplectic scheme applied to the canonical form, and returns the new state.
+    method="midpoint" is 2nd order, method="yoshida4" composes three midpoint steps (4th order).
+    """
+    if method not in SYMPLECTIC_METHODS:
+        raise ValueError(f"Unknown symplectic method '{method}', expected one of {SYMPLECTIC_METHODS}.")
+    params = (m1, m2, l1, l2, g, gamma)
+    Z = to_canonical(Y, m1, m2, l1, l2)
+    if method == "midpoint":
+        Z = implicit_midpoint_step(Z, dt, params)
+    else:
+        for w in (YOSHIDA_W1, YOSHIDA_W0, YOSHIDA_W1):
+            Z = implicit_midpoint_step(Z, w * dt, params)
+    return from_canonical(Z, m1, m2, l1, l2)
@@ -0,0 +1,133 @@
+import json
+import numpy as np
+
+HEADER_SIZE = 4096
+MAGIC = "double-pendulum-trajectory-v1"
+
+
+class TrajectoryStore:
+    """
+    On-disk time series of (4, N, M) grid snapshots, read back through a memory map.
+
+    File layout: a JSON header padded to HEADER_SIZE bytes (N, M, dt, stride, dtype,
+    physical parameters, snapshot count), followed by the raw snapshots one after
+    the other. Snapshot i is the state at step first_step + i * stride, and
+    store[i] only maps that snapshot from disk, never the whole file.
+    """
+
+    def __init__(self, path, mode="r"):
+        """Opens an existing store, mode "r" (read only) or "a" (append snapshots)."""
+        if mode not in ("r", "a"):
+            raise ValueError(f"Unknown mode '{mode}', expected 'r' or 'a'.")
+        self.path = path
+        self.mode = mode
+        with open(path, "rb") as f:
+            header = json.loads(f.read(HEADER_SIZE).decode("utf-8"))
+        if header.get("magic") != MAGIC:
+            raise ValueError(f"{path} is not a trajectory store.")
+        self.header = header
+        self.shape = (4, header["N"], header["M"])
+        self.dtype = np.dtype(header["dtype"])
+        self.snapshot_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        self._file = open(path, "r+b") if mode == "a" else None
+        self._snapshots = None
+
+    @classmethod
+    def create(cls, path, N, M, dt, stride=1, params=None, dtype=np.float64):
+        """Creates an empty store (overwriting path) and opens it for appending."""
+        header = {"magic": MAGIC, "N": int(N), "M": int(M), "dt": float(dt), "stride": int(stride),
+                  "dtype": np.dtype(dtype).str, "params": params or {}, "first_step": 0, "count": 0}
+        with open(path, "wb") as f:
+            f.write(_encode_header(header))
+        return cls(path, mode="a")
+
+    @classmethod
+    def for_matrix(cls, path, pendulums, dt, stride=1):
+        """
+        Creates a store sized and labelled for an OptimizedPendulumMatrix.
+        Swept (array) parameters are summarised by their shape and range.
+        """
+        params = {}
+        for name in ("m1", "m2", "l1", "l2", "g", "gamma"):
+            value = np.asarray(getattr(pendulums, name))
+            if value.ndim == 0:
+                params[name] = value.item()
+            else:
+                params[name] = {"shape": list(value.shape), "min": float(value.min()), "max": float(value.max())}
+        return cls.create(path, pendulums.N, pendulums.M, dt, stride=stride, params=params,
+                          dtype=pendulums.state.dtype)
+
+    @property
+    def stride(self):
+        return self.header["stride"]
+
+    @property
+    def dt(self):
+        return self.header["dt"]
+
+    @property
+    def first_step(self):
+        return self.header["first_step"]
+
+    @property
+    def params(self):
+        return self.header["params"]
+
+    def __len__(self):
+        return self.header["count"]
+
+    def append(self, state, step):
+        """Writes a (4, N, M) state taken at integration step `step` at the end of the store."""
+        if self._file is None:
+            raise ValueError("Store opened read-only, reopen it with mode='a' to append.")
+        state = np.ascontiguousarray(state, dtype=self.dtype)
+        if state.shape != self.shape:
+            raise ValueError(f"Snapshot shape {state.shape} does not match the store shape {self.shape}.")
+        if len(self) == 0:
+            self.header["first_step"] = int(step)
+
+        self._file.seek(HEADER_SIZE + len(self) * self.snapshot_bytes)
+        self._file.write(state.tobytes())
+        self.header["count"] += 1
+        self._file.seek(0)
+        self._file.write(_encode_header(self.header))
+        self._file.flush()
+        self._snapshots = None
+
+    @property
+    def snapshots(self):
+        """Read-only memory map of shape (count, 4, N, M)."""
+        if self._snapshots is None:
+            if len(self) == 0:
+                return np.empty((0,) + self.shape, dtype=self.dtype)
+            self._snapshots = np.memmap(self.path, dtype=self.dtype, mode="r", offset=HEADER_SIZE,
+                                        shape=(len(self),) + self.shape)
+        return self._snapshots
+
+    def __getitem__(self, index):
+        return self.snapshots[index]
+
+    def step_of(self, index):
+        return self.first_step + index * self.stride
+
+    def time(self, index):
+        return self.step_of(index) * self.dt
+
+    def close(self):
+        self._snapshots = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _encode_header(header):
+    encoded = json.dumps(header).encode("utf-8")
+    if len(encoded) > HEADER_SIZE:
+        raise ValueError("Trajectory header too large, pass scalar parameters.")
+    return encoded.ljust(HEADER_SIZE)
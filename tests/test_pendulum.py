@@ -5,6 +5,24 @@ from math import isclose, pi
 from double_pendulum.pendulum import SimplePendulum, DoublePendulum
 from double_pendulum.pendulum_matrix import (theta_to_index, index_to_theta, compute_colormap, 
                                              matrix_generator, DoublePendulumMatrix)
+from double_pendulum.optimized_pendulum_matrix import (OptimizedPendulumMatrix, optimized_different_angles,
+                                                       optimized_different_speeds, optimized_grid)
+from double_pendulum.tiled_executor import TiledExecutor
+from double_pendulum.frame_writer import FrameWriter, frame_to_uint8
+from double_pendulum.checkpoint import save_checkpoint, load_checkpoint
+from double_pendulum.bifurcation_diagram import (bifurcation_diagram_optimized, bifurcation_diagram_poincare,
+                                                  poincare_crossings)
+from double_pendulum.trajectory_store import TrajectoryStore
+from double_pendulum.colormap_lut import ColormapCache, AngleColorizer
+from double_pendulum.lyapunov import lyapunov_map
+from double_pendulum.flip_time import flip_time_map
+from double_pendulum.progressive import progressive_angle_map
+from double_pendulum.precision import divergence_time
+from double_pendulum.instrumentation import Instrumentation
+from double_pendulum.ring_buffer import RingBuffer
+from double_pendulum.physics_worker import PhysicsWorker
+from double_pendulum.blitting import AxesLimits, BlitManager, minmax_decimate
+from double_pendulum.ensemble import perturbed_ensemble, sync_ensemble, ensemble_coords
 
 # --- Simple Pendulum Tests ---
 
@@ -107,6 +125,73 @@ def test_double_energy_conservation(double_sim):
 
     assert isclose(E_start, E_end, rel_tol=1e-3)
 
+def test_double_step_n_matches_step():
+    """The fused multi-step path must follow the same trajectory as repeated step calls."""
+    reference = DoublePendulum(theta1_deg=120.0, theta2_deg=-30.0, omega2=1.5, gamma=0.1)
+    fused = DoublePendulum(theta1_deg=120.0, theta2_deg=-30.0, omega2=1.5, gamma=0.1)
+
+    for _ in range(500):
+        reference.step(0.001)
+    fused.step_n(0.001, 500)
+
+    assert np.allclose(reference.Y, fused.Y, atol=1e-10)
+    assert isclose(reference.time_elapsed, fused.time_elapsed)
+
+def test_simple_step_n_matches_step(simple_sim):
+    reference = SimplePendulum(l=1.0, m=1.0, g=9.81, theta_deg=135, gamma=0.3)
+    simple_sim.set_gamma(0.3)
+
+    for _ in range(200):
+        reference.step(0.005)
+    simple_sim.step_n(0.005, 200)
+
+    assert np.allclose(reference.Y, simple_sim.Y, atol=1e-10)
+
+def test_double_adaptive_energy_conservation(double_sim):
+    """The adaptive RK45 integrator keeps the energy stable with large outer steps."""
+    double_sim.set_gamma(0.0)
+    double_sim.set_initial_conditions(np.array([pi/3, 0, pi/6, 0]))
+    double_sim.reset()
+    double_sim.set_integrator("rk45", rtol=1e-8, atol=1e-10)
+
+    E_start = double_sim.get_energy()
+    for _ in range(50):
+        double_sim.step(0.1)
+
+    assert isclose(double_sim.time_elapsed, 5.0)
+    assert isclose(E_start, double_sim.get_energy(), rel_tol=1e-5)
+
+def test_double_symplectic_energy_conservation(double_sim):
+    """
+    Symplectic integration: with a 10x larger timestep than the RK4 test,
+    the energy error stays bounded instead of drifting.
+    """
+    double_sim.set_gamma(0.0)
+    double_sim.set_initial_conditions(np.array([pi/2, 0, pi/2 + 0.1, 0]))
+    double_sim.reset()
+    double_sim.set_integrator("yoshida4")
+
+    E_start = double_sim.get_energy()
+    errors = []
+    for _ in range(1000):
+        double_sim.step(0.01)
+        errors.append(abs(double_sim.get_energy() - E_start))
+
+    assert max(errors) < 1e-2 * abs(E_start)
+    assert isclose(E_start, double_sim.get_energy(), rel_tol=1e-3)
+
+def test_double_symplectic_handles_damping():
+    """With damping the canonical form still follows the RK4 trajectory."""
+    reference = DoublePendulum(theta1_deg=60.0, theta2_deg=30.0, gamma=0.3)
+    midpoint = DoublePendulum(theta1_deg=60.0, theta2_deg=30.0, gamma=0.3)
+    midpoint.set_integrator("midpoint")
+
+    for _ in range(200):
+        reference.step(0.005)
+        midpoint.step(0.005)
+
+    assert np.allclose(reference.Y, midpoint.Y, atol=1e-3)
+
 # --- PENDULUM MATRIX TESTS ---
 
 def test_matrix_generator_dimension():
@@ -139,11 +224,714 @@ def test_update_color_changes_color():
     assert not np.array_equal(before, after)
 
 
+def test_matrix_cells_are_views_on_the_grid():
+    """Proxies read and write the shared struct-of-arrays state."""
+    sim = DoublePendulumMatrix(matrix_generator(4, 6))
+
+    cell = sim.matrix[1][5]
+    cell.Y = np.array([0.1, 0.2, 0.3, 0.4])
+
+    assert np.array_equal(sim.matrix.engine.state[:, 1, 5], [0.1, 0.2, 0.3, 0.4])
+    assert isclose(cell.get_energy(), DoublePendulum(theta1_deg=np.rad2deg(0.1), omega1=0.2,
+                                                     theta2_deg=np.rad2deg(0.3), omega2=0.4).get_energy())
+
+
+def test_matrix_from_pendulums_keeps_per_cell_parameters():
+    """Pendulums with their own parameters follow their own physics, write_back() updates them."""
+    pendulums = [[DoublePendulum(theta1_deg=90.0, theta2_deg=45.0, m2=m2, g=g) for m2, g in ((1.0, 9.81), (2.0, 3.0))]]
+    sim = DoublePendulumMatrix(pendulums)
+    reference = DoublePendulum(theta1_deg=90.0, theta2_deg=45.0, m2=2.0, g=3.0)
+    for _ in range(100):
+        sim.step(0.01)
+        reference.step(0.01)
+
+    assert sim.matrix[0][1].m2 == 2.0 and sim.matrix[0][0].m2 == 1.0
+    assert np.allclose(sim.matrix[0][1].Y, reference.Y)
+    assert not np.allclose(sim.matrix[0][0].Y, sim.matrix[0][1].Y)
+
+    sim.write_back()
+    assert np.array_equal(pendulums[0][1].Y, sim.matrix[0][1].Y)
+    assert isclose(pendulums[0][0].time_elapsed, 1.0)
+
+
+def test_matrix_cells_step_independently():
+    """Stepping or resetting one cell proxy leaves the state and time of the others untouched."""
+    grid = matrix_generator(3, 3)
+    other = grid[2][2].Y.copy()
+
+    grid[0][0].step(0.01)
+    assert isclose(grid[0][0].time_elapsed, 0.01)
+    assert grid[2][2].time_elapsed == 0.0
+    assert np.array_equal(grid[2][2].Y, other)
+
+    sim = DoublePendulumMatrix(grid)
+    sim.step(0.01)
+    grid[0][0].reset()
+    assert grid[0][0].time_elapsed == 0.0 and isclose(grid[1][1].time_elapsed, 0.01)
+
+    with pytest.raises(ValueError):
+        grid[1][1].set_integrator("rk45")
+    grid.set_integrator("rk45", rtol=1e-8)
+    grid[1][1].step(0.01)
+    assert grid[1][1].rtol == 1e-8 and grid[1][1].h is not None
+    assert grid[0][1].integrator == "rk45"
+
+
+def test_update_color_covers_all_columns():
+    """Every cell of a non-square matrix gets the colormap entry of its angles."""
+    sim = DoublePendulumMatrix(matrix_generator(3, 5))
+    sim.step(0.05)
+    sim.update_color()
+    image = sim.get_image()
+
+    assert image.shape == (3, 5, 4)
+    for i in range(3):
+        for j in range(5):
+            theta1, _, theta2, _ = sim.matrix[i][j].Y
+            expected = sim.colormap[theta_to_index(theta1, 3), theta_to_index(theta2, 5)]
+            assert np.array_equal(image[i, j], expected)
+
+
+# --- OPTIMIZED PENDULUM MATRIX TESTS ---
+
+def test_inplace_kernel_matches_legacy():
+    """The allocation-free kernel must reproduce the legacy RK4 step."""
+    fast = optimized_different_angles(8, 8)
+    legacy = optimized_different_angles(8, 8)
+    legacy.kernel = "legacy"
+
+    for _ in range(100):
+        fast.step(0.001)
+        legacy.step(0.001)
+
+    assert np.allclose(fast.theta1, legacy.theta1, atol=1e-12)
+    assert np.allclose(fast.omega2, legacy.omega2, atol=1e-12)
+
+
+def test_inplace_kernel_matches_double_pendulum():
+    """Per-instance parameters and damping are honoured by the vectorized kernel."""
+    params = dict(l1=1.3, m1=0.7, l2=0.8, m2=1.9, g=3.7, gamma=0.2)
+    single = DoublePendulum(theta1_deg=100.0, theta2_deg=-40.0, omega1=0.5, omega2=-1.0, **params)
+    grid = OptimizedPendulumMatrix(1, 1, single.Y[0], single.Y[2], single.Y[1], single.Y[3], **params)
+
+    for _ in range(200):
+        single.step(0.001)
+        grid.step(0.001)
+
+    assert np.allclose(grid.state[:, 0, 0], single.Y, atol=1e-12)
+
+
+def test_inplace_kernel_keeps_buffers():
+    """Stepping updates the state buffer in place instead of rebinding arrays."""
+    grid = optimized_different_angles(4, 4)
+    theta1_view = grid.theta1
+    grid.step(0.01)
+    assert np.shares_memory(theta1_view, grid.state)
+    assert np.array_equal(theta1_view, grid.theta1)
+
+
+def test_grid_builders_use_both_dimensions():
+    angles = optimized_different_angles(3, 5)
+    speeds = optimized_different_speeds(3, 5)
+
+    assert angles.theta1.shape == angles.omega1.shape == (3, 5)
+    assert np.allclose(angles.theta1[0], np.linspace(-pi, pi, 5))
+    assert np.allclose(angles.theta2[:, 0], np.linspace(-pi, pi, 3))
+    assert np.allclose(speeds.omega1[0], np.linspace(-6, 6, 5))
+    assert np.allclose(speeds.omega2[:, 0], np.linspace(-6, 6, 3))
+
+
+def test_optimized_grid_zooms_on_any_pair():
+    grid = optimized_grid(4, 6, x="theta2", y="omega1", x_range=(0.5, 0.6), y_range=(1.0, 2.0),
+                          theta1=0.3, g=1.62)
+
+    assert np.allclose(grid.theta2[2], np.linspace(0.5, 0.6, 6))
+    assert np.allclose(grid.omega1[:, 3], np.linspace(1.0, 2.0, 4))
+    assert np.all(grid.theta1 == 0.3) and np.all(grid.omega2 == 0.0)
+    assert grid.g == 1.62
+
+    with pytest.raises(ValueError):
+        optimized_grid(2, 2, x="theta1", y="theta1")
+
+
+def test_matrix_energy_matches_double_pendulum():
+    single = DoublePendulum(l1=1.2, m1=0.8, l2=0.7, m2=1.5, g=9.0,
+                            theta1_deg=50.0, omega1=1.0, theta2_deg=-70.0, omega2=-2.0)
+    grid = OptimizedPendulumMatrix(1, 1, single.Y[0], single.Y[2], single.Y[1], single.Y[3],
+                                   l1=1.2, m1=0.8, l2=0.7, m2=1.5, g=9.0)
+    assert isclose(grid.get_energy()[0, 0], single.get_energy())
+
+
+def test_tiled_executor_matches_serial():
+    """Row tiles write back into the shared state and give the same result as serial stepping."""
+    serial = optimized_different_angles(10, 10)
+    tiled = optimized_different_angles(10, 10)
+
+    for _ in range(50):
+        serial.step(0.001)
+    with TiledExecutor(tiled, max_workers=3, tile_rows=4) as executor:
+        assert len(executor.tiles) == 3
+        executor.run(0.001, 50)
+
+    assert np.array_equal(serial.state, tiled.state)
+    assert tiled.step_count == serial.step_count == 50
+
+
+def test_tiled_executor_follows_parameter_changes():
+    """Parameters and kernel changed after creating the executor apply to the next run."""
+    serial = optimized_different_angles(6, 4)
+    tiled = optimized_different_angles(6, 4)
+    with TiledExecutor(tiled, max_workers=2, tile_rows=3) as executor:
+        for grid in (serial, tiled):
+            grid.gamma = 0.5
+            grid.m2 = np.linspace(1.0, 2.0, 6)[:, None]
+            grid.kernel = "rk45"
+        executor.run(0.01, 10)
+    serial.run(0.01, 10)
+
+    assert np.array_equal(serial.state, tiled.state)
+
+
+def test_tiled_executor_keeps_rk45_step_sizes():
+    """Tiles share the adaptive step sizes and evaluation counts of the whole grid."""
+    serial = optimized_different_angles(6, 5, kernel="rk45")
+    tiled = optimized_different_angles(6, 5, kernel="rk45")
+
+    for _ in range(3):
+        serial.step(0.05)
+    with TiledExecutor(tiled, max_workers=2, tile_rows=4) as executor:
+        executor.run(0.05, 3)
+
+    assert np.array_equal(serial.h, tiled.h)
+    assert np.array_equal(serial.nfev, tiled.nfev)
+    assert np.array_equal(serial.state, tiled.state)
+
+
+def test_rk45_kernel_matches_rk4_with_fewer_evaluations():
+    """Per-cell adaptive steps follow the fixed-step solution at a fraction of the cost."""
+    adaptive = optimized_different_angles(6, 6)
+    adaptive.kernel = "rk45"
+    reference = optimized_different_angles(6, 6)
+
+    for _ in range(10):
+        adaptive.step(0.05)
+    for _ in range(500):
+        reference.step(0.001)
+
+    assert np.allclose(adaptive.state, reference.state, atol=1e-4)
+    assert adaptive.nfev.max() < 4 * 500
+
+
+def test_symplectic_kernel_matches_rk4():
+    symplectic = optimized_different_angles(6, 6)
+    symplectic.kernel = "yoshida4"
+    reference = optimized_different_angles(6, 6)
+
+    for _ in range(50):
+        symplectic.step(0.01)
+    for _ in range(500):
+        reference.step(0.001)
+
+    assert np.allclose(symplectic.state, reference.state, atol=1e-3)
+
+
+
+@pytest.mark.parametrize("kernel", ["inplace", "rk45"])
+def test_parameter_sweep_matches_scalar_runs(kernel):
+    """An (N, M) parameter array gives each cell the trajectory of a scalar run."""
+    sweep = optimized_grid(3, 2, x="theta1", y="m2", x_range=(0.5, 2.0), y_range=(0.5, 3.0),
+                           theta2=1.0, gamma=np.array([0.0, 0.2]), kernel=kernel)
+    for _ in range(50):
+        sweep.step(0.01)
+
+    for i in range(3):
+        for j in range(2):
+            single = OptimizedPendulumMatrix(1, 1, [0.5, 2.0][j], 1.0, 0.0, 0.0,
+                                             m2=sweep.m2[i, j], gamma=[0.0, 0.2][j], kernel=kernel)
+            for _ in range(50):
+                single.step(0.01)
+            assert np.allclose(single.state[:, 0, 0], sweep.state[:, i, j], atol=1e-12)
+
+
+def test_parameter_sweep_take_and_tile():
+    sweep = optimized_grid(4, 3, x="theta1", y="l2", y_range=(0.5, 2.0))
+    batch = sweep.take([1, 5, 10])
+    assert np.allclose(batch.l2[:, 0], sweep.l2.reshape(-1)[[1, 5, 10]])
+
+    with TiledExecutor(sweep, max_workers=2, tile_rows=2) as executor:
+        executor.run(0.01, 20)
+    serial = optimized_grid(4, 3, x="theta1", y="l2", y_range=(0.5, 2.0))
+    for _ in range(20):
+        serial.step(0.01)
+    assert np.array_equal(sweep.state, serial.state)
+
+    with pytest.raises(ValueError):
+        OptimizedPendulumMatrix(2, 2, 0.0, 0.0, 0.0, 0.0, m2=np.ones(3))
+    with pytest.raises(ValueError):  # The legacy kernel would ignore the sweep
+        optimized_grid(2, 2, x="theta1", y="m2", y_range=(1.0, 2.0), kernel="legacy")
+    with pytest.raises(ValueError):
+        optimized_different_angles(2, 2, gamma=0.1, kernel="legacy")
+
+
+def test_flat_parameters_are_built_once():
+    """Broadcast parameter arrays are flattened once, and again only after a new assignment."""
+    grid = OptimizedPendulumMatrix(3, 4, 0.5, 1.0, 0.0, 0.0, m2=np.linspace(1, 2, 3)[:, None], kernel="rk45")
+    flat = grid._flat_parameter("m2")
+    grid.step(0.05)
+    assert grid._flat_parameter("m2") is flat
+    assert np.array_equal(flat, np.repeat(np.linspace(1, 2, 3), 4))
+
+    grid.m2 = np.full((3, 4), 2.0)
+    assert np.array_equal(grid._cell_parameters([0, 11])["m2"], [2.0, 2.0])
+
+
+@pytest.mark.parametrize("kernel", ["inplace", "rk45", "yoshida4"])
+def test_float32_kernels_stay_float32(kernel):
+    grid = optimized_different_angles(5, 5, kernel=kernel, dtype=np.float32, m2=np.linspace(1, 2, 5))
+    for _ in range(10):
+        grid.step(0.01)
+
+    reference = optimized_different_angles(5, 5, kernel=kernel, m2=np.linspace(1, 2, 5))
+    for _ in range(10):
+        reference.step(0.01)
+
+    assert grid.state.dtype == np.float32
+    assert np.allclose(grid.state, reference.state, atol=1e-3)
+
+
+def test_divergence_time_between_precisions():
+    grid = optimized_different_angles(4, 4)
+    diverged_at = divergence_time(grid, dt=0.01, T=0.5, threshold=0.1)
+    assert diverged_at.shape == (4, 4)
+    assert np.all(np.isinf(diverged_at))  # Too short for rounding errors to grow
+    assert grid.state.dtype == np.float64 and grid.astype(np.float32).state.dtype == np.float32
+
+
+# --- LYAPUNOV MAP TESTS ---
+
+def test_lyapunov_map_separates_regular_and_chaotic_cells():
+    """Small oscillations have a near-zero exponent, a high-energy start a clearly positive one."""
+    grid = OptimizedPendulumMatrix(2, 1, np.array([[0.1], [3.0]]), np.array([[0.1], [3.0]]),
+                                   np.zeros((2, 1)), np.zeros((2, 1)))
+    calls = []
+
+    exponents = lyapunov_map(grid, dt=0.005, T=30.0, progress=lambda step, n: calls.append((step, n)))
+
+    assert exponents.shape == (2, 1)
+    assert abs(exponents[0, 0]) < 0.1
+    assert exponents[1, 0] > 0.5
+    assert calls[-1] == (6000, 6000)
+    assert np.array_equal(grid.theta1, [[0.1], [3.0]])  # Input matrix left untouched
+
+
+# --- FLIP TIME MAP TESTS ---
+
+def test_flip_time_map_matches_full_integration():
+    """Compacting the active set does not change the recorded flip times."""
+    dt, n_steps = 0.01, 300
+    flip_time, forbidden = flip_time_map(optimized_different_angles(12, 12), dt=dt, T=n_steps * dt)
+
+    reference = optimized_different_angles(12, 12)
+    expected = np.full((12, 12), np.inf)
+    for step in range(1, n_steps + 1):
+        reference.step(dt)
+        flipped = (np.abs(reference.theta1) > np.pi) | (np.abs(reference.theta2) > np.pi)
+        expected[flipped & np.isinf(expected)] = step * dt
+
+    assert forbidden.any()
+    assert np.isinf(flip_time[forbidden]).all()
+    assert np.isinf(expected[forbidden]).all()  # The energy criterion never excludes a flipping cell
+    assert np.array_equal(flip_time, expected)
+
+
+# --- PROGRESSIVE RENDERING TESTS ---
+
+def test_progressive_map_full_refinement_matches_direct_map():
+    """With a zero threshold every block is refined and the last level is the full map."""
+    levels = list(progressive_angle_map(16, 16, dt=0.01, T=1.0, coarse_step=4, threshold=0.0))
+    assert [step for step, _, _ in levels] == [4, 2, 1]
+
+    direct = optimized_different_angles(16, 16)
+    for _ in range(100):
+        direct.step(0.01)
+    expected = AngleColorizer(16, 16)(direct.theta1, direct.theta2)
+
+    _, image, n_computed = levels[-1]
+    assert n_computed == 16 * 16
+    assert np.array_equal(image, expected)
+
+
+def test_progressive_map_skips_smooth_regions():
+    levels = list(progressive_angle_map(32, 32, dt=0.01, T=0.5, coarse_step=8, threshold=0.5))
+    n_computed = [n for _, _, n in levels]
+
+    assert n_computed[0] == 16
+    assert n_computed == sorted(n_computed)
+    assert n_computed[-1] < 32 * 32
+
+
+# --- COLORMAP LOOKUP TABLE TESTS ---
+
+def test_colormap_cache_lru_and_disk(tmp_path):
+    cache = ColormapCache(maxsize=2, cache_dir=str(tmp_path))
+    lut = cache.get(4, 6)
+
+    assert lut.shape == (4, 6, 4) and lut.dtype == np.uint8
+    assert np.array_equal(lut, np.clip(compute_colormap(4, 6) * 255, 0, 255).astype(np.uint8))
+    assert cache.get(4, 6) is lut
+
+    cache.get(5, 5)
+    cache.get(6, 6)  # Evicts (4, 6), the least recently used table
+    assert (4, 6, "cyclic_pinwheel") not in cache._tables
+    assert len(list(tmp_path.iterdir())) == 3
+
+    reloaded = ColormapCache(cache_dir=str(tmp_path)).get(4, 6)
+    assert np.array_equal(reloaded, lut)
+
+
+def test_angle_colorizer_matches_index_formula():
+    N, M = 7, 9
+    rng = np.random.default_rng(1)
+    theta1 = rng.uniform(-3 * pi, 3 * pi, size=(N, M))
+    theta2 = rng.uniform(-3 * pi, 3 * pi, size=(N, M))
+
+    i_indices = ((theta1 + np.pi) / (2 * np.pi) * N).astype(int) % N
+    j_indices = ((theta2 + np.pi) / (2 * np.pi) * M).astype(int) % M
+    expected = np.clip(compute_colormap(N, M)[i_indices, j_indices] * 255, 0, 255).astype(np.uint8)
+
+    colorizer = AngleColorizer(N, M)
+    frame = colorizer(theta1, theta2)
+    assert np.array_equal(frame, expected)
+    assert colorizer(theta1, theta2) is frame  # Reused frame buffer
+
+
+# --- FRAME WRITER TESTS ---
+
+def test_frame_to_uint8_matches_clip_conversion():
+    frame = np.random.default_rng(0).uniform(-0.2, 1.2, size=(5, 7, 4))
+    expected = np.clip(frame * 255, 0, 255).astype(np.uint8)
+    assert np.array_equal(frame_to_uint8(frame), expected)
+
+
+def test_frame_writer_streams_png_sequence(tmp_path):
+    """Each appended frame is written immediately as its own PNG file."""
+    out_dir = tmp_path / "frames"
+    with FrameWriter(str(out_dir), fps=10) as writer:
+        for value in (0.0, 0.5, 1.0):
+            writer.append(np.full((4, 4, 4), value))
+        assert len(list(out_dir.iterdir())) == 3
+
+    assert writer.frame_count == 3
+
+
+def test_frame_writer_gif_memory_does_not_grow(tmp_path):
+    """GIF frames are encoded as they come: memory stays flat however many frames are appended."""
+    import gc
+    import tracemalloc
+    from PIL import Image
+
+    x = np.linspace(0, 1, 128)
+    frames = [np.stack(np.broadcast_arrays(k / 4 * x[:, None], x[None, :], 0.5, 1.0), axis=-1) for k in range(4)]
+    tracemalloc.start()
+    try:
+        with FrameWriter(str(tmp_path / "anim.gif"), fps=10) as writer:
+            for k in range(10):
+                writer.append(frames[k % 4])
+            gc.collect()  # Pillow's frame encoder leaves reference cycles for the collector
+            early = tracemalloc.get_traced_memory()[0]
+            for k in range(40):
+                writer.append(frames[k % 4])
+            gc.collect()
+            late = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+    assert late - early < 2**18  # 40 more frames of 64 KB each
+    with Image.open(tmp_path / "anim.gif") as gif:
+        assert gif.n_frames == 50 and gif.size == (128, 128)
+
+
+# --- INSTRUMENTATION TESTS ---
+
+def test_instrumentation_disabled_records_nothing():
+    timers = Instrumentation()
+    with timers.stage("integration"):
+        pass
+    timers.count("steps", 10)
+    timers.tick()
+
+    assert timers.stage("integration") is timers.stage("colouring")  # Shared no-op
+    assert timers.stages == {} and timers.counters == {} and len(timers.frame_times) == 0
+
+
+def test_instrumentation_report_and_json_export(tmp_path):
+    import json
+
+    timers = Instrumentation(enabled=True)
+    grid = optimized_different_angles(4, 5)
+    for _ in range(3):
+        for _ in range(2):
+            with timers.stage("integration"):
+                grid.step(0.01)
+            timers.count("steps")
+            timers.count("cell_steps", 20)
+        timers.tick()
+
+    report = timers.report()
+    assert report["stages"]["integration"]["calls"] == 6
+    assert report["counters"] == {"steps": 6, "cell_steps": 120}
+    assert report["rates"]["cell_steps_per_second"] == pytest.approx(20 * report["rates"]["steps_per_second"])
+    assert report["frames"]["count"] == 2
+    assert report["frames"]["p50_s"] <= report["frames"]["p99_s"]
+
+    timers.export_json(str(tmp_path / "report.json"))
+    with open(tmp_path / "report.json") as f:
+        assert json.load(f)["counters"]["steps"] == 6
+
+
+# --- RING BUFFER TESTS ---
+
+def test_ring_buffer_keeps_last_rows_in_order():
+    history = RingBuffer(2, maxlen=5)
+    for i in range(23):
+        history.append((i, -i))
+
+    assert len(history) == 5
+    assert np.array_equal(history.values()[:, 0], np.arange(18, 23))
+    assert history.values().flags["C_CONTIGUOUS"]
+    assert tuple(history[-1]) == (22, -22)
+    assert history._data.shape == (10, 2)  # Constant memory
+
+
+def test_ring_buffer_grows_without_maxlen():
+    history = RingBuffer(2, capacity=4)
+    for i in range(100):
+        history.append((i, i))
+    assert np.array_equal(np.array(history)[:, 1], np.arange(100))
+
+    history.maxlen = 10  # Limiting later keeps the most recent rows
+    history.append((100, 100))
+    assert np.array_equal(history.values()[:, 0], np.arange(91, 101))
+
+    history.clear()
+    assert len(history) == 0 and history.values().shape == (0, 2)
+
+
+# --- PHYSICS WORKER TESTS ---
+
+def test_physics_worker_follows_wall_clock():
+    """The background thread never runs ahead of the wall clock and queues ordered snapshots."""
+    import time
+
+    sim = DoublePendulum(theta1_deg=120.0, theta2_deg=-30.0)
+    worker = PhysicsWorker(sim, dt=0.001, steps_per_snapshot=10)
+    start = time.perf_counter()
+    worker.start()
+    deadline = start + 10.0
+    while len(worker.snapshots) < 5 and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    worker.pause()
+    elapsed = time.perf_counter() - start
+    snapshots = worker.drain()
+    paused_time = sim.time_elapsed
+    time.sleep(0.05)
+    assert sim.time_elapsed == paused_time and not worker.snapshots  # No simulation while paused
+    worker.stop()
+
+    times = [snapshot.time for snapshot in snapshots]
+    assert len(times) >= 5
+    assert times[-1] <= elapsed + 0.01 + 1e-9  # At most one snapshot period ahead
+    assert np.allclose(np.diff(times), 0.01)
+    assert snapshots[-1].energy == pytest.approx(sim.get_energy(), rel=1e-6)
+
+
+# --- PLOT BLITTING TESTS ---
+
+def test_minmax_decimate_keeps_envelope():
+    t = np.linspace(0, 10, 100001)
+    e = np.sin(t) + 0.01 * np.random.default_rng(0).standard_normal(t.size)
+    t_dec, e_dec = minmax_decimate(t, e, 400)
+
+    assert len(t_dec) <= 800
+    assert e_dec.min() == e.min() and e_dec.max() == e.max()
+    assert np.all(np.diff(t_dec) >= 0)
+    short = e[:500]
+    assert minmax_decimate(t[:500], short, 400)[1] is short  # Short curves unchanged
+
+
+def test_axes_limits_rescale_only_when_needed():
+    from matplotlib.figure import Figure
+
+    ax = Figure().add_subplot()
+    limits = AxesLimits(ax)
+    assert limits.update(np.array([0.0, 2.0]), np.array([2.0, 3.0]))
+    assert not limits.update(np.array([0.0, 2.1]), np.array([2.0, 3.0]))  # Still inside the margin
+    assert limits.update(np.array([0.0, 5.0]), np.array([2.0, 3.0]))
+    xlim = ax.get_xlim()
+    assert xlim[0] < 0.0 and xlim[1] > 5.0
+
+    limits.freeze(np.array([-10.0, 0.0]), np.array([0.0, 1.0]))
+    assert limits.update(np.array([0.0, 1.0]), np.array([2.0, 3.0]))
+    assert ax.get_xlim()[0] < -10.0  # Frozen lines stay visible
+
+
+def test_blit_manager_avoids_full_redraws():
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure()
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.set_xlim(0, 1), ax.set_ylim(0, 1)
+    line, = ax.plot([0, 1], [0, 1], color="#ff0000")
+    draws = []
+    canvas.mpl_connect("draw_event", lambda event: draws.append(event))
+
+    blitter = BlitManager(canvas, min_full_draw_interval=60.0)
+    blitter.set_artists([line])
+    blitter.update()  # First frame: full draw capturing the background
+    for _ in range(5):
+        blitter.update()
+    blitter.update(full=True)  # Throttled
+    assert len(draws) == 1
+
+    pixels = np.asarray(canvas.buffer_rgba())
+    assert np.any(np.all(pixels[..., :3] == (255, 0, 0), axis=-1))  # Line blitted over the background
+
+
+# --- ENSEMBLE TESTS ---
+
+def test_ensemble_follows_the_main_pendulum():
+    """The unperturbed member stays on the DoublePendulum trajectory, the others fan out."""
+    sim = DoublePendulum(l1=1.2, m2=0.8, gamma=0.05, theta1_deg=170.0, theta2_deg=175.0)
+    ensemble = perturbed_ensemble(sim, 101, spread_deg=0.01)
+    assert ensemble.theta2.shape == (101, 1)
+    assert np.ptp(np.rad2deg(ensemble.theta2)) == pytest.approx(0.02)
+
+    sim.step_n(0.001, 3000)
+    assert sync_ensemble(ensemble, sim, sim.time_elapsed, 0.001) == 3000
+    assert sync_ensemble(ensemble, sim, sim.time_elapsed, 0.001) == 0
+
+    middle = ensemble.state[:, 50, 0]
+    assert np.allclose(middle, sim.Y, atol=1e-9)
+    (x1, y1), (x2, y2) = sim.get_cartesian_coords()
+    coords = ensemble_coords(ensemble)
+    assert np.allclose([c[50] for c in coords], [x1, y1, x2, y2], atol=1e-8)
+    assert np.ptp(ensemble.theta2) > np.deg2rad(0.02)  # Sensitive dependence on initial conditions
+
+
+# --- CHECKPOINT TESTS ---
+
+def test_checkpoint_resume_is_bit_for_bit(tmp_path):
+    path = str(tmp_path / "run.npz")
+    grid = optimized_different_angles(5, 5)
+    grid.gamma = 0.1
+    for _ in range(30):
+        grid.step(0.001)
+    save_checkpoint(path, grid, 30, samples=np.arange(3.0))
+
+    for _ in range(20):
+        grid.step(0.001)
+    resumed, step, extra = load_checkpoint(path)
+    for _ in range(20):
+        resumed.step(0.001)
+
+    assert step == 30
+    assert resumed.gamma == 0.1
+    assert np.array_equal(extra["samples"], np.arange(3.0))
+    assert np.array_equal(resumed.state, grid.state)
+
+
+def test_animation_checkpoint_checks_output_and_settings(tmp_path):
+    from double_pendulum.animation import optimized_simulation_gif
+
+    path = str(tmp_path / "anim.npz")
+    with pytest.raises(ValueError):
+        optimized_simulation_gif(optimized_different_angles(4, 4), filename=str(tmp_path / "x.gif"),
+                                 checkpoint_path=path)
+    assert not (tmp_path / "x.gif").exists()
+
+    frames = str(tmp_path / "frames")
+    optimized_simulation_gif(optimized_different_angles(4, 4), dt=0.01, tau=0.02, T=0.1, filename=frames,
+                             checkpoint_path=path, checkpoint_every=1)
+    with pytest.raises(ValueError):
+        optimized_simulation_gif(optimized_different_angles(4, 4), dt=0.005, tau=0.02, T=0.1, filename=frames,
+                                 checkpoint_path=path)
+
+
+def test_bifurcation_resumes_from_checkpoint(tmp_path):
+    """A run resumed from a mid-run checkpoint gives the same samples as the uninterrupted run."""
+    kwargs = dict(n_omega2=4, T=0.3, dt=0.001, samples_per_branch=5, filename=str(tmp_path / "bif.png"))
+    _, reference = bifurcation_diagram_optimized(**kwargs)
+
+    path = str(tmp_path / "bif.npz")
+    bifurcation_diagram_optimized(checkpoint_path=path, checkpoint_every=200, **kwargs)
+    _, resumed = bifurcation_diagram_optimized(checkpoint_path=path, checkpoint_every=200, **kwargs)
+
+    assert np.array_equal(np.array(reference), np.array(resumed))
+
+
+# --- TRAJECTORY STORE TESTS ---
+
+def test_trajectory_store_records_at_stride(tmp_path):
+    path = str(tmp_path / "traj.bin")
+    grid = optimized_different_angles(4, 4)
+    reference = optimized_different_angles(4, 4)
+
+    with TrajectoryStore.for_matrix(path, grid, dt=0.001, stride=5) as store:
+        grid.run(0.001, 20, store=store)
+    for _ in range(10):
+        reference.step(0.001)
+
+    store = TrajectoryStore(path)
+    assert len(store) == 5  # Steps 0, 5, 10, 15, 20
+    assert store.snapshots.shape == (5, 4, 4, 4)
+    assert isclose(store.time(2), 0.01)
+    assert store.params["g"] == 9.81
+    assert np.array_equal(store[2], reference.state)
+    assert np.array_equal(store[-1], grid.state)
+    store.close()
+
+
 # ============================================================
 # BIFURCATION DIAGRAM LOGIC TESTS
 # (light tests, do not generate full plots)
 # ============================================================
 
+def test_bifurcation_optimized_returns_arrays():
+    """Samples are stored in a preallocated (n_omega2, samples_per_branch) array."""
+    omegas, points = bifurcation_diagram_optimized(n_omega2=8, T=0.5, samples_per_branch=10, plot=False)
+
+    assert omegas.shape == (8, 1)
+    assert points.shape == (8, 10)
+    assert not np.isnan(points).any()
+    assert np.all((points >= -180) & (points <= 180))
+
+
+def test_poincare_crossings_detection():
+    """Only upward crossings of θ₁ = 0 (mod 2π) count, with the interpolated position."""
+    theta1_prev = np.array([-0.1, 0.1, 2*pi - 0.3, -0.2])
+    theta1_new = np.array([0.3, -0.1, 2*pi + 0.1, -0.1])
+    omega1_new = np.array([1.0, -1.0, 1.0, 1.0])
+
+    crossed, alpha = poincare_crossings(theta1_prev, theta1_new, omega1_new)
+
+    assert crossed.tolist() == [True, False, True, False]
+    assert isclose(alpha[0], 0.25)
+    assert isclose(alpha[2], 0.75)
+
+
+def test_bifurcation_poincare_pads_branches():
+    omegas, points, counts = bifurcation_diagram_poincare(n_omega2=6, T=4.0, dt=0.002,
+                                                          max_points_per_branch=5, plot=False)
+
+    assert points.shape == (6, 5)
+    assert counts.max() > 0
+    for branch, count in zip(points, counts):
+        assert not np.isnan(branch[:count]).any()
+        assert np.isnan(branch[count:]).all()
+
+
 def dummy_bifurcation_test():
     """Ensures angles are wrapped correctly and dataset sizes match."""
     from bifurcation_diagram import bifurcation_diagram